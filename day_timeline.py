@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Per-day timeline of display periods and upcoming zmanim
+Built once per zmanim file and day; lookups are a single bisect
+"""
+
+from bisect import bisect_right
+from collections import namedtuple
+from datetime import timedelta
+
+TIME_FORMAT = "%-I:%M %p"  # e.g. "7:51 PM" (no leading zero)
+
+# Friday/Shabbos offsets from sunset, in minutes (candle lighting and Havdalah
+# are defaults that a location profile can override)
+CANDLE_LIGHTING_MINUTES = 19
+SHABBOS_SUNSET_MINUTES = 1
+MAARIV_MINUTES = 59
+HAVDALAH_MINUTES = 73
+
+FRIDAY = 4
+SATURDAY = 5
+
+
+def format_time(time_obj):
+    """Format a datetime for display"""
+    return time_obj.strftime(TIME_FORMAT)
+
+
+def _format_times(named_times):
+    """[(name, datetime or None)] -> [[name, "7:51 PM"]], skipping missing times"""
+    return [[name, format_time(time_obj)] for name, time_obj in named_times if time_obj]
+
+
+def _period_key(now, weekday, t, havdalah_minutes):
+    """Which display period an instant falls in (evaluated only when building)"""
+    chatzot_night = t.get('chatzotNight')
+    sunrise = t.get('sunrise')
+    chatzot = t['chatzot']
+    sunset = t['sunset']
+
+    if chatzot_night and sunrise and chatzot_night <= now < sunrise:
+        return 'early_morning'
+    if sunrise and sunrise <= now < chatzot:
+        return 'morning'
+    if chatzot <= now < sunset:
+        return 'afternoon'
+    if weekday == SATURDAY and now >= sunset:
+        if now < sunset + timedelta(minutes=havdalah_minutes):
+            return 'shabbos_evening'
+        return 'motzei_shabbos'
+    if now >= sunset or (chatzot_night and now < chatzot_night):
+        return 'evening'
+    # Fallback - show Shacharis times
+    return 'fallback'
+
+
+def _period_views(weekday, t, candle_lighting_minutes, havdalah_minutes):
+    """Period label and formatted relevant times for each period key"""
+    sunset = t['sunset']
+    chatzot_night = t.get('chatzotNight')
+    shabbos_sunset = sunset - timedelta(minutes=SHABBOS_SUNSET_MINUTES)
+    havdalah = sunset + timedelta(minutes=havdalah_minutes)
+
+    morning_times = _format_times([
+        ("Shema (MGA)", t.get('sofZmanShmaMGA')),
+        ("Shema (Gra)", t.get('sofZmanShma')),
+        ("Tefilla (Gra)", t.get('sofZmanTfilla')),
+        ("Chatzos", t['chatzot']),
+    ])
+
+    if weekday == SATURDAY:
+        afternoon_label = "Shabbos Afternoon"
+        afternoon_times = _format_times([
+            ("Mincha Ketana", t.get('minchaKetana')),
+            ("Sunset", sunset),
+            ("Maariv", sunset + timedelta(minutes=60)),
+            # With the default offset Havdalah is shown as tzeit72min (sunset + 72 minutes)
+            ("Havdalah", t.get('tzeit72min') if havdalah_minutes == HAVDALAH_MINUTES else havdalah),
+        ])
+    elif weekday == FRIDAY:
+        afternoon_label = "Erev Shabbos"
+        afternoon_times = _format_times([
+            ("Mincha Ketana", t.get('minchaKetana')),
+            ("Candle Lighting", sunset - timedelta(minutes=candle_lighting_minutes)),
+            ("Sunset", shabbos_sunset),
+        ])
+    else:
+        afternoon_label = "Afternoon"
+        afternoon_times = _format_times([
+            ("Mincha Ketana", t.get('minchaKetana')),
+            ("Sunset", sunset),
+        ])
+
+    return {
+        'early_morning': ("Early Morning", _format_times([
+            ("Midnight", chatzot_night),
+            ("Dawn", t.get('alotHaShachar')),
+            ("Earliest Daven", t.get('misheyakirMachmir')),
+            ("Sunrise", t.get('sunrise')),
+        ])),
+        'morning': ("Shabbos Morning" if weekday == SATURDAY else "Morning", morning_times),
+        'fallback': ("Morning", morning_times),
+        'afternoon': (afternoon_label, afternoon_times),
+        'shabbos_evening': ("Shabbos Evening", _format_times([
+            ("Sunset", shabbos_sunset),
+            ("Maariv", sunset + timedelta(minutes=MAARIV_MINUTES)),
+            ("Havdalah", havdalah),
+        ])),
+        'motzei_shabbos': ("Motzei Shabbos", _format_times([
+            ("Havdalah", havdalah),
+            ("Latest Maleve Malka", chatzot_night),
+        ])),
+        'evening': ("Evening", _format_times([
+            ("Tzeis (72 min)", t.get('tzeit72min')),
+            ("Chatzos Night", chatzot_night),
+        ])),
+    }
+
+
+def _day_zmanim(weekday, t, candle_lighting_minutes, havdalah_minutes):
+    """Every zman shown as "next" during the day, as (name, datetime)"""
+    sunset = t['sunset']
+    zmanim = [
+        ("Midnight", t.get('chatzotNight')),
+        ("Dawn", t.get('alotHaShachar')),
+        ("Earliest Daven", t.get('misheyakirMachmir')),
+        ("Sunrise", t.get('sunrise')),
+        ("Shema (MGA)", t.get('sofZmanShmaMGA')),
+        ("Shema (Gra)", t.get('sofZmanShma')),
+        ("Tefilla (Gra)", t.get('sofZmanTfilla')),
+        ("Chatzos", t['chatzot']),
+        ("Mincha Ketana", t.get('minchaKetana')),
+    ]
+
+    shabbos_sunset = sunset - timedelta(minutes=SHABBOS_SUNSET_MINUTES)
+    if weekday == FRIDAY:
+        zmanim.append(("Candle Lighting", sunset - timedelta(minutes=candle_lighting_minutes)))
+        zmanim.append(("Sunset", shabbos_sunset))
+    elif weekday == SATURDAY:
+        zmanim.append(("Sunset", shabbos_sunset))
+        zmanim.append(("Maariv", sunset + timedelta(minutes=MAARIV_MINUTES)))
+        zmanim.append(("Havdalah", sunset + timedelta(minutes=havdalah_minutes)))
+    else:
+        zmanim.append(("Sunset", sunset))
+
+    zmanim.append(("Tzeis (72 min)", t.get('tzeit72min')))
+    zmanim.append(("Chatzos Night", t.get('chatzotNight')))
+
+    # Stable sort keeps list order for identical instants
+    return sorted([(name, time_obj) for name, time_obj in zmanim if time_obj], key=lambda item: item[1])
+
+
+class DayTimeline(namedtuple('DayTimeline', [
+        'day', 'sunset', 'boundaries', 'periods', 'zman_instants', 'zman_names'])):
+    """Immutable lookup of the display period and next zman for one civil day.
+
+    periods[i] is (label, formatted_times) for instants in
+    [boundaries[i - 1], boundaries[i]); periods[0] covers everything before
+    the first boundary and periods[-1] everything after the last.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def build(cls, time_objects, day, candle_lighting_minutes=CANDLE_LIGHTING_MINUTES,
+              havdalah_minutes=HAVDALAH_MINUTES):
+        """Build the timeline from parsed zmanim, or None if chatzot/sunset are missing"""
+        if not time_objects.get('chatzot') or not time_objects.get('sunset'):
+            return None
+
+        weekday = day.weekday()
+        views = _period_views(weekday, time_objects, candle_lighting_minutes, havdalah_minutes)
+
+        # The period only changes at these instants, so classifying the start of
+        # each interval (and one instant before the first) covers the whole day
+        instants = [time_objects.get(key) for key in ('chatzotNight', 'sunrise', 'chatzot', 'sunset')]
+        if weekday == SATURDAY:
+            instants.append(time_objects['sunset'] + timedelta(minutes=havdalah_minutes))
+        instants = sorted(set(instant for instant in instants if instant))
+
+        keys = [_period_key(instants[0] - timedelta(microseconds=1), weekday, time_objects, havdalah_minutes)]
+        boundaries = []
+        for instant in instants:
+            key = _period_key(instant, weekday, time_objects, havdalah_minutes)
+            if key != keys[-1]:
+                boundaries.append(instant)
+                keys.append(key)
+
+        zmanim = _day_zmanim(weekday, time_objects, candle_lighting_minutes, havdalah_minutes)
+
+        return cls(
+            day=day,
+            sunset=time_objects['sunset'],
+            boundaries=tuple(boundaries),
+            periods=tuple(views[key] for key in keys),
+            zman_instants=tuple(time_obj for _, time_obj in zmanim),
+            zman_names=tuple(name for name, _ in zmanim),
+        )
+
+    def period_at(self, now):
+        """(period label, [[name, formatted time], ...]) for an instant"""
+        return self.periods[bisect_right(self.boundaries, now)]
+
+    def next_zman(self, now):
+        """(name, datetime) of the first zman strictly after now, or None"""
+        index = bisect_right(self.zman_instants, now)
+        if index == len(self.zman_instants):
+            return None
+        return self.zman_names[index], self.zman_instants[index]
+
+    def next_change(self, now):
+        """The next instant at which the period changes, or None"""
+        index = bisect_right(self.boundaries, now)
+        if index == len(self.boundaries):
+            return None
+        return self.boundaries[index]
@@ -0,0 +1,29 @@
+"""
+Gunicorn settings for zmanim-tracker.service
+Run with: gunicorn -c gunicorn.conf.py wsgi:application
+"""
+
+import multiprocessing
+
+bind = '0.0.0.0:5001'
+
+# Responses are served from per-minute snapshots, so a couple of processes with a
+# few threads each is plenty; CACHE_FILE and the lock files in zmanim_server.py
+# keep the workers from repeating upstream fetches
+workers = min(4, multiprocessing.cpu_count())
+worker_class = 'gthread'
+threads = 4
+
+# Don't preload: the background refresher thread must start in each worker, after fork
+preload_app = False
+
+timeout = 30
+graceful_timeout = 10
+keepalive = 5
+
+# Recycle workers occasionally so a slow leak can't accumulate
+max_requests = 10000
+max_requests_jitter = 1000
+
+accesslog = None
+errorlog = '-'
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for Hebcal API calls
+Pooled keep-alive session, bounded retries with jittered backoff, and a
+circuit breaker so a slow or failing hebcal.com doesn't stall every request
+"""
+
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Seconds to wait for a connection, then for the response
+DEFAULT_TIMEOUT = (3.05, 10)
+
+# Upper bound in seconds on one get_json() call including retries: no retry
+# starts after it, and each attempt's read timeout is cut to the time left
+DEFAULT_DEADLINE = 12
+
+# Upstream statuses worth retrying; other 4xx errors are returned immediately
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised without touching the network while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures; lets one trial call through after a cooldown"""
+
+    def __init__(self, failure_threshold=5, reset_timeout=60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """True if a call may go to the network"""
+        with self._lock:
+            state = self._state()
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                # A failed trial call re-opens the breaker for another cooldown
+                self.opened_at = time.monotonic()
+
+
+class HebcalClient:
+    """requests.Session wrapper used by every Hebcal fetcher"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, retries=2, backoff=0.5, backoff_max=4.0,
+                 pool_size=4, breaker=None, deadline=DEFAULT_DEADLINE):
+        self.timeout = timeout
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def _retry_delay(self, attempt):
+        # Full jitter keeps many workers from retrying in lockstep
+        return random.uniform(0, min(self.backoff_max, self.backoff * (2 ** attempt)))
+
+    def _get(self, url, params):
+        """session.get with retries; connection errors and retryable statuses
+        are retried within the deadline, read timeouts are not"""
+        connect_timeout, read_timeout = self.timeout
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                response = self.session.get(url, params=params,
+                                            timeout=(connect_timeout, max(0.1, min(read_timeout, remaining))))
+                if response.status_code in RETRY_STATUSES:
+                    response.raise_for_status()
+                return response
+            except requests.exceptions.ReadTimeout:
+                # The server is already slow; don't pile on
+                raise
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.HTTPError):
+                delay = self._retry_delay(attempt)
+                if attempt < self.retries and time.monotonic() + delay < deadline:
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                raise
+
+    def get_json(self, url, params=None):
+        """GET a URL and decode its JSON body.
+
+        Connection errors and retryable statuses are retried within the
+        deadline; a read timeout is not, since the server is already slow.
+        Raises a requests.exceptions.RequestException subclass on failure,
+        including CircuitOpenError when the breaker is failing fast.
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {url}; skipping request")
+
+        # Every exit records an outcome, or a half-open trial would never end
+        try:
+            response = self._get(url, params)
+        except BaseException:
+            self.breaker.record_failure()
+            raise
+
+        try:
+            response.raise_for_status()
+            data = response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            # A 4xx or an unparseable body means the server is up; don't trip the breaker
+            self.breaker.record_success()
+            raise
+        except BaseException:
+            self.breaker.record_failure()
+            raise
+
+        self.breaker.record_success()
+        return data
+
+    def stats(self):
+        return {
+            'circuit': self.breaker.state,
+            'consecutive_failures': self.breaker.failures
+        }
+
+
+# Shared instance so all fetchers reuse the same connection pool and breaker
+client = HebcalClient()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Offline Hebrew calendar conversion
+Gregorian -> Hebrew dates using the fixed arithmetic calendar (molad and
+dechiyot), formatted the same way as the Hebcal API's "hdate" field
+"""
+
+from collections import namedtuple
+from datetime import date, timedelta
+from functools import lru_cache
+
+# Month numbering follows Nisan = 1 ... Elul = 6, Tishrei = 7 ... Adar = 12,
+# Adar II = 13 (leap years only)
+NISAN, IYYAR, SIVAN, TAMUZ, AV, ELUL = 1, 2, 3, 4, 5, 6
+TISHREI, CHESHVAN, KISLEV, TEVET, SHVAT, ADAR, ADAR_II = 7, 8, 9, 10, 11, 12, 13
+
+MONTH_NAMES = {
+    NISAN: 'Nisan',
+    IYYAR: 'Iyyar',
+    SIVAN: 'Sivan',
+    TAMUZ: 'Tamuz',
+    AV: 'Av',
+    ELUL: 'Elul',
+    TISHREI: 'Tishrei',
+    CHESHVAN: 'Cheshvan',
+    KISLEV: 'Kislev',
+    TEVET: 'Tevet',
+    SHVAT: "Sh'vat",
+    ADAR: 'Adar',
+    ADAR_II: 'Adar II',
+}
+
+# Day number (date.toordinal()) of 1 Tishrei AM 1
+HEBREW_EPOCH = -1373427
+
+HebrewDate = namedtuple('HebrewDate', ['year', 'month', 'day'])
+
+
+def is_leap_year(year):
+    """True if the Hebrew year has Adar I and Adar II"""
+    return (7 * year + 1) % 19 < 7
+
+
+def months_in_year(year):
+    return 13 if is_leap_year(year) else 12
+
+
+def _elapsed_days(year):
+    """Days from the epoch to the molad of Tishrei, with the lo ADU rosh delay"""
+    months_elapsed = (235 * year - 234) // 19
+    parts_elapsed = 12084 + 13753 * months_elapsed
+    days = 29 * months_elapsed + parts_elapsed // 25920
+    if (3 * (days + 1)) % 7 < 3:
+        days += 1
+    return days
+
+
+def _year_length_correction(year):
+    """Extra delay keeping year lengths within the allowed set"""
+    ny0 = _elapsed_days(year - 1)
+    ny1 = _elapsed_days(year)
+    ny2 = _elapsed_days(year + 1)
+    if ny2 - ny1 == 356:
+        return 2
+    if ny1 - ny0 == 382:
+        return 1
+    return 0
+
+
+@lru_cache(maxsize=64)
+def new_year(year):
+    """Ordinal day number of Rosh Hashana (1 Tishrei) of the Hebrew year"""
+    return HEBREW_EPOCH + _elapsed_days(year) + _year_length_correction(year)
+
+
+def days_in_year(year):
+    return new_year(year + 1) - new_year(year)
+
+
+def days_in_month(month, year):
+    """Number of days in a Hebrew month"""
+    if month in (IYYAR, TAMUZ, ELUL, TEVET, ADAR_II):
+        return 29
+    if month == ADAR and not is_leap_year(year):
+        return 29
+    if month == CHESHVAN and days_in_year(year) % 10 != 5:
+        return 29
+    if month == KISLEV and days_in_year(year) % 10 == 3:
+        return 29
+    return 30
+
+
+def _month_order(year):
+    """Months in calendar order starting from Tishrei"""
+    return list(range(TISHREI, months_in_year(year) + 1)) + list(range(NISAN, TISHREI))
+
+
+def hebrew_to_ordinal(year, month, day):
+    """Ordinal day number (as date.toordinal()) of a Hebrew date"""
+    ordinal = new_year(year) + day - 1
+    for m in _month_order(year):
+        if m == month:
+            return ordinal
+        ordinal += days_in_month(m, year)
+    raise ValueError(f"Invalid Hebrew month {month} for year {year}")
+
+
+def hebrew_to_gregorian(year, month, day):
+    """Convert a Hebrew date to a datetime.date"""
+    return date.fromordinal(hebrew_to_ordinal(year, month, day))
+
+
+def gregorian_to_hebrew(gregorian_date):
+    """Convert a datetime.date to a HebrewDate(year, month, day)"""
+    ordinal = gregorian_date.toordinal()
+
+    # Mean year length is 35975351/98496 days; the estimate is at most one year ahead
+    year = (ordinal - HEBREW_EPOCH) * 98496 // 35975351 + 1
+    while new_year(year) > ordinal:
+        year -= 1
+    while new_year(year + 1) <= ordinal:
+        year += 1
+
+    day_of_year = ordinal - new_year(year)
+    for month in _month_order(year):
+        length = days_in_month(month, year)
+        if day_of_year < length:
+            return HebrewDate(year, month, day_of_year + 1)
+        day_of_year -= length
+
+    raise ValueError(f"Could not convert {gregorian_date} to a Hebrew date")
+
+
+def month_name(month, year):
+    """Hebcal-style month name ("Adar I" in leap years)"""
+    if month == ADAR and is_leap_year(year):
+        return 'Adar I'
+    return MONTH_NAMES[month]
+
+
+def format_hebrew_date(hebrew_date):
+    """Format as Hebcal's hdate field, e.g. "27 Tishrei 5786" """
+    return f"{hebrew_date.day} {month_name(hebrew_date.month, hebrew_date.year)} {hebrew_date.year}"
+
+
+def hebrew_date_string(gregorian_date, after_sunset=False):
+    """Hebrew date string for a civil date; after sunset the next day has begun"""
+    if after_sunset:
+        gregorian_date = gregorian_date + timedelta(days=1)
+    return format_hebrew_date(gregorian_to_hebrew(gregorian_date))
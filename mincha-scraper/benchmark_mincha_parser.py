@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Mincha parser benchmark and golden check
+Parses the checked-in pdf_text_debug.txt (August 2025 calendar), compares
+every day against hand-checked Mincha times and reports parse timings
+next to those of the old per-day scan, kept below as a baseline.
+Exits with status 1 if any day differs (the baseline is reported, not checked).
+"""
+
+import contextlib
+import io
+import os
+import re
+import sys
+import time
+from datetime import date
+
+import mincha_scraper_enhanced as scraper
+
+PDF_TEXT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pdf_text_debug.txt')
+
+# First Mincha listed in each day's cell, read off the calendar by hand
+# (August 31 isn't in the extracted text)
+GOLDEN = {
+    '2025-08-01': '6:20 PM',
+    '2025-08-02': '6:00 PM',
+    '2025-08-03': '2:00 PM',
+    '2025-08-04': '7:50 PM',
+    '2025-08-05': '7:50 PM',
+    '2025-08-06': '7:50 PM',
+    '2025-08-07': '7:50 PM',
+    '2025-08-08': '6:10 PM',
+    '2025-08-09': '5:50 PM',
+    '2025-08-10': '7:40 PM',
+    '2025-08-11': '7:40 PM',
+    '2025-08-12': '7:40 PM',
+    '2025-08-13': '7:40 PM',
+    '2025-08-14': '7:40 PM',
+    '2025-08-15': '6:05 PM',
+    '2025-08-16': '5:40 PM',
+    '2025-08-17': '7:30 PM',
+    '2025-08-18': '7:30 PM',
+    '2025-08-19': '7:30 PM',
+    '2025-08-20': '7:30 PM',
+    '2025-08-21': '7:30 PM',
+    '2025-08-22': '5:55 PM',
+    '2025-08-23': '5:20 PM',
+    '2025-08-24': '7:20 PM',
+    '2025-08-25': '7:20 PM',
+    '2025-08-26': '7:20 PM',
+    '2025-08-27': '7:20 PM',
+    '2025-08-28': '7:20 PM',
+    '2025-08-29': '7:10 PM',
+    '2025-08-30': '5:25 PM',
+}
+
+def legacy_find_mincha_time(pdf_text, day):
+    """find_mincha_time_for_today() before the single-pass tokenizer, kept as a
+    timing baseline (verbatim except that it takes the day instead of today)"""
+    if not pdf_text:
+        return None
+
+    today = day
+    today_str = today.strftime("%B %d")  # e.g., "February 14"
+    today_day = today.day
+    today_month = today.strftime("%B")
+
+    print(f"Looking for Mincha time for: {today_str}")
+
+    # Split text into lines for easier parsing
+    lines = pdf_text.split('\n')
+
+    # Look for today's date and Mincha time
+    for i, line in enumerate(lines):
+        # Look for date patterns - multiple formats
+        date_patterns = [
+            rf'\b{today_month}\s+{today_day}\b',
+            rf'\b{today_day}\s+{today_month}\b',
+            rf'\b{today_month}\s+{today_day},?\s+\d{{4}}\b',
+            rf'\b{today_day}/\d{{1,2}}/\d{{4}}\b',  # MM/DD/YYYY format
+            rf'\b{today_day}-\d{{1,2}}-\d{{4}}\b',  # DD-MM-YYYY format
+            rf'\b{today_day}\b',  # Just the day number (for calendar format)
+        ]
+
+        for pattern in date_patterns:
+            if re.search(pattern, line, re.IGNORECASE):
+                print(f"Found today's date on line {i}: {line.strip()}")
+
+                # Look for Mincha time in the same line or nearby lines
+                mincha_patterns = [
+                    r'mincha\s*:?\s*(\d{1,2}:\d{2}\s*[ap]m)',
+                    r'mincha\s*:?\s*(\d{1,2}:\d{2})',
+                    r'(\d{1,2}:\d{2}\s*[ap]m)\s*mincha',
+                    r'mincha\s*(\d{1,2}:\d{2}\s*[ap]m)',
+                    r'mincha\s*:?\s*(\d{1,2}:\d{2})/(\d{1,2}:\d{2})',  # Multiple times format
+                    r'mincha-(\d{1,2}:\d{2})',  # Calendar format: Mincha-7:30
+                ]
+
+                for pattern in mincha_patterns:
+                    mincha_match = re.search(pattern, line, re.IGNORECASE)
+                    if mincha_match:
+                        if len(mincha_match.groups()) > 1:
+                            # Multiple times format (e.g., "5:55/7:20")
+                            times = mincha_match.groups()
+                            mincha_time = f"{times[0]}:{times[1]} PM"  # Use the later time
+                            print(f"Found Mincha times: {times}, using: {mincha_time}")
+                            return mincha_time
+                        else:
+                            mincha_time = mincha_match.group(1).strip()
+                            # Add PM if not already present (Mincha is always afternoon)
+                            if not re.search(r'[ap]m', mincha_time, re.IGNORECASE):
+                                mincha_time += " PM"
+                            print(f"Found Mincha time: {mincha_time}")
+                            return mincha_time
+
+                # Check previous few lines for Mincha time (calendar format often has times before dates)
+                for j in range(max(0, i-5), i):
+                    for pattern in mincha_patterns:
+                        mincha_match = re.search(pattern, lines[j], re.IGNORECASE)
+                        if mincha_match:
+                            if len(mincha_match.groups()) > 1:
+                                # Multiple times format
+                                times = mincha_match.groups()
+                                mincha_time = f"{times[0]}:{times[1]} PM"  # Use the later time
+                                print(f"Found Mincha times on line {j}: {times}, using: {mincha_time}")
+                                return mincha_time
+                            else:
+                                mincha_time = mincha_match.group(1).strip()
+                                # Add PM if not already present (Mincha is always afternoon)
+                                if not re.search(r'[ap]m', mincha_time, re.IGNORECASE):
+                                    mincha_time += " PM"
+                                print(f"Found Mincha time on line {j}: {mincha_time}")
+                                return mincha_time
+
+                # Check next few lines for Mincha time
+                for j in range(i+1, min(i+10, len(lines))):
+                    for pattern in mincha_patterns:
+                        mincha_match = re.search(pattern, lines[j], re.IGNORECASE)
+                        if mincha_match:
+                            if len(mincha_match.groups()) > 1:
+                                # Multiple times format
+                                times = mincha_match.groups()
+                                mincha_time = f"{times[0]}:{times[1]} PM"  # Use the later time
+                                print(f"Found Mincha times on line {j}: {times}, using: {mincha_time}")
+                                return mincha_time
+                            else:
+                                mincha_time = mincha_match.group(1).strip()
+                                # Add PM if not already present (Mincha is always afternoon)
+                                if not re.search(r'[ap]m', mincha_time, re.IGNORECASE):
+                                    mincha_time += " PM"
+                                print(f"Found Mincha time on line {j}: {mincha_time}")
+                                return mincha_time
+
+    # If not found, try alternative search patterns
+    print("Trying alternative search patterns...")
+
+    # Look for any Mincha time in the document
+    all_mincha_matches = re.findall(r'mincha\s*:?\s*(\d{1,2}:\d{2}\s*[ap]m)', pdf_text, re.IGNORECASE)
+    if all_mincha_matches:
+        print(f"Found Mincha times in document: {all_mincha_matches}")
+        # Return the first one as fallback
+        return all_mincha_matches[0].strip()
+
+    # Look for any time pattern that might be Mincha
+    time_patterns = re.findall(r'(\d{1,2}:\d{2}\s*[ap]m)', pdf_text)
+    if time_patterns:
+        print(f"Found time patterns in document: {time_patterns[:5]}...")
+
+    # If still not found, use a fallback time based on typical summer Mincha times
+    print("Using fallback Mincha time for summer months")
+    return "8:15 PM"
+
+def timed(fn, repeat):
+    """Average milliseconds per call of fn(), with its printing silenced"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    with open(PDF_TEXT_FILE, 'r', encoding='utf-8') as f:
+        pdf_text = f.read()
+
+    index = scraper.build_mincha_index(pdf_text)
+    with contextlib.redirect_stdout(io.StringIO()):
+        lookups = {day: scraper.find_mincha_time_for_today(pdf_text, date.fromisoformat(day)) for day in GOLDEN}
+        legacy = {day: legacy_find_mincha_time(pdf_text, date.fromisoformat(day)) for day in GOLDEN}
+
+    failures = 0
+    for day, expected in GOLDEN.items():
+        parsed = index.get(day, {}).get('mincha')
+        if parsed != expected or lookups[day] != expected:
+            failures += 1
+            print(f"MISMATCH {day}: expected {expected}, index {parsed}, lookup {lookups[day]}")
+    extra = sorted(set(index) - set(GOLDEN))
+    if extra:
+        failures += len(extra)
+        print(f"Unexpected days in index: {extra}")
+    legacy_matches = sum(legacy[day] == expected for day, expected in GOLDEN.items())
+
+    lookup_repeat = max(1, repeat // 10)
+    month_ms = timed(lambda: scraper.build_mincha_index(pdf_text), repeat)
+    lookup_ms = timed(lambda: [scraper.find_mincha_time_for_today(pdf_text, date.fromisoformat(day)) for day in GOLDEN],
+                      lookup_repeat) / len(GOLDEN)
+    legacy_ms = timed(lambda: [legacy_find_mincha_time(pdf_text, date.fromisoformat(day)) for day in GOLDEN],
+                      lookup_repeat) / len(GOLDEN)
+
+    print(f"{'':<24}{'golden days':>12}{'ms/day':>10}{'ms/month':>10}")
+    print(f"{'single-pass tokenizer':<24}{f'{len(GOLDEN) - failures}/{len(GOLDEN)}':>12}"
+          f"{lookup_ms:>10.3f}{month_ms:>10.3f}")
+    print(f"{'old per-day scan':<24}{f'{legacy_matches}/{len(GOLDEN)}':>12}"
+          f"{legacy_ms:>10.3f}{legacy_ms * len(GOLDEN):>10.3f}")
+    print(f"Speedup per day: {legacy_ms / lookup_ms:.1f}x, whole month: {legacy_ms * len(GOLDEN) / month_ms:.1f}x")
+
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
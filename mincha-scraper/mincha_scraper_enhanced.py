@@ -9,23 +9,131 @@ import json
 import re
 import PyPDF2
 import io
+import hashlib
+import calendar
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, date
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 import os
 
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Downloads are cached by URL with their ETag/Last-Modified so unchanged pages and
+# PDFs are revalidated with a conditional GET instead of downloaded again. Bodies and
+# extracted PDF text are stored by SHA-256 of the content.
+CACHE_DIR = 'mincha_cache'
+HTTP_CACHE_FILE = os.path.join(CACHE_DIR, 'http_cache.json')
+_HTTP_CACHE_LOCK = threading.Lock()
+
+# Mincha source: 'index' parses the whole month calendar once per new PDF into
+# MINCHA_INDEX_FILE and looks today up there; 'scan' searches the PDF text for
+# today's date on every run
+MINCHA_SOURCE = 'index'
+MINCHA_INDEX_FILE = 'mincha_index.json'
+
+# Calendars in the index: 'all' merges every PDF on the calendar page (so days
+# around a month boundary are covered), downloading them on a bounded thread pool
+# and extracting new ones in worker processes (PyPDF2 is CPU-bound);
+# 'current' indexes only the current month's PDF
+MINCHA_PDFS = 'all'
+DOWNLOAD_WORKERS = 4
+EXTRACT_WORKERS = os.cpu_count() or 1
+
+MONTH_HEADER_PATTERN = re.compile(
+    r'\b(January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{4})\b',
+    re.IGNORECASE)
+PAGE_MARKER_PATTERN = re.compile(r'^--- PAGE (\d+) ---$', re.MULTILINE)
+MINCHA_PATTERN = re.compile(r'mincha\s*[-:]?\s*(\d{1,2}:\d{2})(?:\s*/\s*(\d{1,2}:\d{2}))?', re.IGNORECASE)
+MINCHA_AMPM_PATTERN = re.compile(r'mincha\s*:?\s*(\d{1,2}:\d{2}\s*[ap]m)', re.IGNORECASE)
+# A calendar cell's day number at the start of a line. PyPDF2 sometimes glues it
+# onto the Pirkei Avos chapter above it (e.g. "Pirkei Avos-32" for chapter 3 on the 2nd).
+DAY_NUMBER_PATTERN = re.compile(r'(?:Pirkei Avos-\d)?(\d{1,2})(?![\d:])')
+# How far into a page's text to look for its month header (e.g. "AUGUST 2025")
+PAGE_HEADER_CHARS = 500
+
+def _write_atomic(path, data):
+    """Write bytes to path via a temp file and rename"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _blob_path(sha256, ext):
+    return os.path.join(CACHE_DIR, f"{sha256}.{ext}")
+
+def load_http_cache():
+    """{url: {'etag', 'last_modified', 'sha256', 'fetched_at'}} from the cache index"""
+    try:
+        with open(HTTP_CACHE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_http_cache(cache):
+    """Write the cache index and delete bodies and texts no URL refers to any more"""
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    _write_atomic(HTTP_CACHE_FILE, json.dumps(cache, indent=2).encode('utf-8'))
+    keep = {entry['sha256'] for entry in cache.values()}
+    for name in os.listdir(CACHE_DIR):
+        sha256, ext = name.split('.', 1)[0], os.path.splitext(name)[1]
+        if ext in ('.body', '.txt') and sha256 not in keep:
+            os.remove(os.path.join(CACHE_DIR, name))
+
+def cached_get(url, timeout):
+    """GET a URL, revalidating a cached copy with If-None-Match/If-Modified-Since.
+
+    Returns the body (from the cache on 304 Not Modified); raises on HTTP errors.
+    """
+    with _HTTP_CACHE_LOCK:
+        entry = load_http_cache().get(url)
+    cached_body = None
+    if entry and os.path.exists(_blob_path(entry['sha256'], 'body')):
+        with open(_blob_path(entry['sha256'], 'body'), 'rb') as f:
+            cached_body = f.read()
+
+    headers = dict(HEADERS)
+    if cached_body is not None:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    response = requests.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and cached_body is not None:
+        print(f"Not modified, using cached copy: {url}")
+        return cached_body
+    response.raise_for_status()
+
+    body = response.content
+    sha256 = hashlib.sha256(body).hexdigest()
+    # Re-read the index under the lock: other downloads may have updated it, and
+    # the body must be registered before anyone else prunes unreferenced blobs
+    with _HTTP_CACHE_LOCK:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        if not os.path.exists(_blob_path(sha256, 'body')):
+            _write_atomic(_blob_path(sha256, 'body'), body)
+        cache = load_http_cache()
+        cache[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'sha256': sha256,
+            'fetched_at': datetime.now().isoformat()
+        }
+        save_http_cache(cache)
+    return body
+
 def get_calendar_pdf_urls(base_url):
     """Get URLs of all available calendar PDFs from the Beth Jehudah calendar page"""
     try:
         # Get the calendar page
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(base_url, headers=headers, timeout=10)
-        response.raise_for_status()
+        content = cached_get(base_url, timeout=10)
         
         # Parse the HTML
-        soup = BeautifulSoup(response.content, 'html.parser')
+        soup = BeautifulSoup(content, 'html.parser')
         
         # Look for all PDF links
         all_links = soup.find_all('a', href=True)
@@ -57,150 +165,307 @@ def get_calendar_pdf_urls(base_url):
         return {}
 
 def download_pdf(pdf_url):
-    """Download the PDF calendar"""
+    """Download the PDF calendar (revalidating the cached copy if there is one)"""
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(pdf_url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return response.content
+        return cached_get(pdf_url, timeout=30)
     except Exception as e:
         print(f"Error downloading PDF: {e}")
         return None
 
-def extract_text_from_pdf(pdf_content):
-    """Extract text from PDF content"""
+def download_pdfs(pdf_urls):
+    """{url: content} for every PDF that downloaded, fetched concurrently"""
+    with ThreadPoolExecutor(max_workers=max(1, min(DOWNLOAD_WORKERS, len(pdf_urls)))) as pool:
+        contents = dict(zip(pdf_urls, pool.map(download_pdf, pdf_urls)))
+    return {url: content for url, content in contents.items() if content}
+
+def _text_path(pdf_content, months=None):
+    """Cache file for a PDF's text, or for only some months' pages of it"""
+    sha256 = hashlib.sha256(pdf_content).hexdigest()
+    if not months:
+        return _blob_path(sha256, 'txt')
+    return _blob_path(sha256, '+'.join(f"{year}-{month:02d}" for year, month in sorted(months)) + '.txt')
+
+def load_cached_text(pdf_content, months=None):
+    """Text previously extracted from the same PDF (and months), or None"""
     try:
-        pdf_file = io.BytesIO(pdf_content)
-        pdf_reader = PyPDF2.PdfReader(pdf_file)
-        
-        text = ""
-        for page_num, page in enumerate(pdf_reader.pages):
-            page_text = page.extract_text()
-            text += f"\n--- PAGE {page_num + 1} ---\n"
-            text += page_text
-        
+        with open(_text_path(pdf_content, months), 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def extract_text_from_pdf(pdf_content, months=None):
+    """Extract text from PDF content, reusing the text cached for the same PDF.
+
+    months, a set of (year, month), limits the text to the pages of those
+    months' calendars (see _extract_text).
+    """
+    text = load_cached_text(pdf_content, months)
+    if text is not None:
+        print("Using cached PDF text")
         return text
+
+    text_path = _text_path(pdf_content, months)
+    text = _extract_text(pdf_content, months)
+    if text:
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            _write_atomic(text_path, text.encode('utf-8'))
+        except OSError as e:
+            print(f"Error caching PDF text: {e}")
+    return text
+
+def extract_texts(pdf_contents):
+    """{url: text} for downloaded PDFs, extracting the uncached ones in parallel processes"""
+    texts = {}
+    pending = {}
+    for url, content in pdf_contents.items():
+        text = load_cached_text(content)
+        if text is None:
+            pending[url] = content
+        else:
+            texts[url] = text
+
+    if len(pending) > 1:
+        print(f"Extracting text from {len(pending)} PDFs...")
+        with ProcessPoolExecutor(max_workers=min(EXTRACT_WORKERS, len(pending))) as pool:
+            texts.update(zip(pending, pool.map(extract_text_from_pdf, pending.values())))
+    else:
+        for url, content in pending.items():
+            texts[url] = extract_text_from_pdf(content)
+
+    # Keep the calendar page's order
+    return {url: texts[url] for url in pdf_contents if texts.get(url)}
+
+def iter_pdf_pages(pdf_content):
+    """Yield (page number, text) for each page, extracting it only when it's reached"""
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
+    for page_num, page in enumerate(pdf_reader.pages, 1):
+        yield page_num, page.extract_text() or ""
+
+def _page_month(page_text):
+    """(year, month) from a calendar header near the top of a page, or None"""
+    header = MONTH_HEADER_PATTERN.search(page_text[:PAGE_HEADER_CHARS])
+    if not header:
+        return None
+    return int(header.group(2)), datetime.strptime(header.group(1).title(), '%B').month
+
+def _extract_text(pdf_content, months=None):
+    """Extract text from PDF content with PyPDF2.
+
+    With months, pages are kept only from a header for one of those months up
+    to the next header for another month, and extraction stops once every
+    month has been passed. If no page has a matching header, the whole PDF
+    is extracted.
+    """
+    try:
+        parts = []
+        current = None
+        seen = set()
+        for page_num, page_text in iter_pdf_pages(pdf_content):
+            if months:
+                current = _page_month(page_text) or current
+                if current not in months:
+                    if seen >= months:
+                        break
+                    continue
+                seen.add(current)
+            parts.append(f"\n--- PAGE {page_num} ---\n")
+            parts.append(page_text)
+        
+        if months and not parts:
+            print("No pages for the requested months, extracting the whole PDF")
+            return _extract_text(pdf_content)
+        return "".join(parts)
     except Exception as e:
         print(f"Error extracting text from PDF: {e}")
         return None
 
-def find_mincha_time_for_today(pdf_text):
-    """Find today's Mincha time from the PDF text"""
+def find_mincha_time_for_today(pdf_text, day=None):
+    """Find today's (or another date's) Mincha time from the PDF text"""
     if not pdf_text:
         return None
     
-    today = date.today()
-    today_str = today.strftime("%B %d")  # e.g., "February 14"
-    today_day = today.day
-    today_month = today.strftime("%B")
+    day = day or date.today()
+    print(f"Looking for Mincha time for: {day.strftime('%B %d')}")
     
-    print(f"Looking for Mincha time for: {today_str}")
-    
-    # Split text into lines for easier parsing
-    lines = pdf_text.split('\n')
-    
-    # Look for today's date and Mincha time
-    for i, line in enumerate(lines):
-        # Look for date patterns - multiple formats
-        date_patterns = [
-            rf'\b{today_month}\s+{today_day}\b',
-            rf'\b{today_day}\s+{today_month}\b',
-            rf'\b{today_month}\s+{today_day},?\s+\d{{4}}\b',
-            rf'\b{today_day}/\d{{1,2}}/\d{{4}}\b',  # MM/DD/YYYY format
-            rf'\b{today_day}-\d{{1,2}}-\d{{4}}\b',  # DD-MM-YYYY format
-            rf'\b{today_day}\b',  # Just the day number (for calendar format)
-        ]
-        
-        for pattern in date_patterns:
-            if re.search(pattern, line, re.IGNORECASE):
-                print(f"Found today's date on line {i}: {line.strip()}")
-                
-                # Look for Mincha time in the same line or nearby lines
-                mincha_patterns = [
-                    r'mincha\s*:?\s*(\d{1,2}:\d{2}\s*[ap]m)',
-                    r'mincha\s*:?\s*(\d{1,2}:\d{2})',
-                    r'(\d{1,2}:\d{2}\s*[ap]m)\s*mincha',
-                    r'mincha\s*(\d{1,2}:\d{2}\s*[ap]m)',
-                    r'mincha\s*:?\s*(\d{1,2}:\d{2})/(\d{1,2}:\d{2})',  # Multiple times format
-                    r'mincha-(\d{1,2}:\d{2})',  # Calendar format: Mincha-7:30
-                ]
-                
-                for pattern in mincha_patterns:
-                    mincha_match = re.search(pattern, line, re.IGNORECASE)
-                    if mincha_match:
-                        if len(mincha_match.groups()) > 1:
-                            # Multiple times format (e.g., "5:55/7:20")
-                            times = mincha_match.groups()
-                            mincha_time = f"{times[0]}:{times[1]} PM"  # Use the later time
-                            print(f"Found Mincha times: {times}, using: {mincha_time}")
-                            return mincha_time
-                        else:
-                            mincha_time = mincha_match.group(1).strip()
-                            # Add PM if not already present (Mincha is always afternoon)
-                            if not re.search(r'[ap]m', mincha_time, re.IGNORECASE):
-                                mincha_time += " PM"
-                            print(f"Found Mincha time: {mincha_time}")
-                            return mincha_time
-                
-                # Check previous few lines for Mincha time (calendar format often has times before dates)
-                for j in range(max(0, i-5), i):
-                    for pattern in mincha_patterns:
-                        mincha_match = re.search(pattern, lines[j], re.IGNORECASE)
-                        if mincha_match:
-                            if len(mincha_match.groups()) > 1:
-                                # Multiple times format
-                                times = mincha_match.groups()
-                                mincha_time = f"{times[0]}:{times[1]} PM"  # Use the later time
-                                print(f"Found Mincha times on line {j}: {times}, using: {mincha_time}")
-                                return mincha_time
-                            else:
-                                mincha_time = mincha_match.group(1).strip()
-                                # Add PM if not already present (Mincha is always afternoon)
-                                if not re.search(r'[ap]m', mincha_time, re.IGNORECASE):
-                                    mincha_time += " PM"
-                                print(f"Found Mincha time on line {j}: {mincha_time}")
-                                return mincha_time
-                
-                # Check next few lines for Mincha time
-                for j in range(i+1, min(i+10, len(lines))):
-                    for pattern in mincha_patterns:
-                        mincha_match = re.search(pattern, lines[j], re.IGNORECASE)
-                        if mincha_match:
-                            if len(mincha_match.groups()) > 1:
-                                # Multiple times format
-                                times = mincha_match.groups()
-                                mincha_time = f"{times[0]}:{times[1]} PM"  # Use the later time
-                                print(f"Found Mincha times on line {j}: {times}, using: {mincha_time}")
-                                return mincha_time
-                            else:
-                                mincha_time = mincha_match.group(1).strip()
-                                # Add PM if not already present (Mincha is always afternoon)
-                                if not re.search(r'[ap]m', mincha_time, re.IGNORECASE):
-                                    mincha_time += " PM"
-                                print(f"Found Mincha time on line {j}: {mincha_time}")
-                                return mincha_time
+    for cell_date, entry in iter_mincha_times(pdf_text):
+        if cell_date == day:
+            print(f"Found Mincha time on page {entry['page']}, line {entry['line']}: {entry['mincha']}")
+            return entry['mincha']
     
     # If not found, try alternative search patterns
     print("Trying alternative search patterns...")
     
     # Look for any Mincha time in the document
-    all_mincha_matches = re.findall(r'mincha\s*:?\s*(\d{1,2}:\d{2}\s*[ap]m)', pdf_text, re.IGNORECASE)
+    all_mincha_matches = MINCHA_AMPM_PATTERN.findall(pdf_text)
     if all_mincha_matches:
         print(f"Found Mincha times in document: {all_mincha_matches}")
         # Return the first one as fallback
         return all_mincha_matches[0].strip()
     
-    # Look for any time pattern that might be Mincha
-    time_patterns = re.findall(r'(\d{1,2}:\d{2}\s*[ap]m)', pdf_text)
-    if time_patterns:
-        print(f"Found time patterns in document: {time_patterns[:5]}...")
-    
     # If still not found, use a fallback time based on typical summer Mincha times
     print("Using fallback Mincha time for summer months")
     return "8:15 PM"
 
+def _split_pages(pdf_text):
+    """[(page number, page text)] from extract_text_from_pdf() output (page 0 is any text before the first marker)"""
+    parts = PAGE_MARKER_PATTERN.split(pdf_text)
+    pages = [(0, parts[0])]
+    for number, page_text in zip(parts[1::2], parts[2::2]):
+        pages.append((int(number), page_text[1:] if page_text.startswith('\n') else page_text))
+    return pages
+
+def iter_mincha_times(pdf_text):
+    """Walk a calendar's text once, yielding (date, {'mincha', 'times', 'page', 'line', 'text'}).
+
+    Each page's month comes from its header (see _page_month); a page without
+    one continues the previous page's month, so a PDF with several months'
+    calendars yields all of them. In the extracted text each weekday cell's
+    times come before its day number, while Shabbos cells have the day number
+    first and Mincha after it. The first Mincha listed in a cell is used;
+    'times' keeps all of the times on that line (e.g. an early and a late
+    minyan). Days are yielded in order.
+    """
+    pages = _split_pages(pdf_text or '')
+    if len(pages) == 1:
+        # Text without page markers: take the first header anywhere in it
+        header = MONTH_HEADER_PATTERN.search(pdf_text or '')
+        page_months = [(int(header.group(2)), datetime.strptime(header.group(1).title(), '%B').month)
+                       if header else None]
+    else:
+        page_months = [_page_month(page_text) for _, page_text in pages]
+    if not any(page_months):
+        print("Could not find the calendar's month and year")
+        return
+
+    current = None
+    for (page, page_text), page_month in zip(pages, page_months):
+        if page_month and page_month != current:
+            # A new month's calendar starts on this page
+            current = page_month
+            year, month = current
+            days_in_month = calendar.monthrange(year, month)[1]
+            next_day = 1
+            pending = None   # first Mincha since the last day number
+            open_day = None  # day number seen before its Mincha (Shabbos cells)
+        if current is None:
+            # Cover pages before the first calendar
+            continue
+
+        for line_number, line in enumerate(page_text.split('\n'), 1):
+            rest = line
+            day_marker = DAY_NUMBER_PATTERN.match(line) if next_day <= days_in_month else None
+            if day_marker and int(day_marker.group(1)) == next_day:
+                if pending:
+                    yield date(year, month, next_day), pending
+                    pending = None
+                else:
+                    open_day = next_day
+                next_day += 1
+                rest = line[day_marker.end():]
+
+            mincha_match = MINCHA_PATTERN.search(rest)
+            if mincha_match:
+                times = [f"{t} PM" for t in mincha_match.groups() if t]
+                entry = {'mincha': times[0], 'times': times, 'page': page, 'line': line_number, 'text': line.strip()}
+                if open_day:
+                    yield date(year, month, open_day), entry
+                    open_day = None
+                elif pending is None:
+                    pending = entry
+
+def build_mincha_index(pdf_text):
+    """{ISO date: {'mincha', 'times', 'page', 'line', 'text'}} for every day of a month calendar"""
+    return {day.isoformat(): entry for day, entry in iter_mincha_times(pdf_text)}
+
+def merge_mincha_indexes(pdf_texts):
+    """One index for several calendars ({url: text}), each day tagged with its 'pdf_url'.
+
+    If two PDFs list the same date, the first one on the calendar page wins.
+    """
+    days = {}
+    for url, pdf_text in pdf_texts.items():
+        for day, entry in build_mincha_index(pdf_text).items():
+            if day in days:
+                print(f"{day} is listed in both {days[day]['pdf_url']} and {url}, keeping the first")
+                continue
+            days[day] = dict(entry, pdf_url=url)
+    return dict(sorted(days.items()))
+
+def load_mincha_index():
+    """Contents of MINCHA_INDEX_FILE, or {} if there isn't a readable one"""
+    try:
+        with open(MINCHA_INDEX_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_mincha_index(days, pdfs):
+    """Write the index, recording the PDFs it came from ({url: sha256})"""
+    index = {
+        'source': "Beth Jehudah Calendar",
+        'pdfs': pdfs,
+        'generated_at': datetime.now().isoformat(),
+        'days': days
+    }
+    _write_atomic(MINCHA_INDEX_FILE, json.dumps(index, indent=2).encode('utf-8'))
+    print(f"Mincha index saved to {MINCHA_INDEX_FILE}: {len(days)} days")
+    return index
+
+def load_cached_body(url):
+    """Last downloaded body for a URL from the HTTP cache, or None"""
+    with _HTTP_CACHE_LOCK:
+        entry = load_http_cache().get(url)
+    try:
+        with open(_blob_path(entry['sha256'], 'body'), 'rb') as f:
+            return f.read()
+    except (TypeError, OSError):
+        return None
+
+def update_mincha_index_all(calendar_pdfs):
+    """Index every calendar PDF, downloading them concurrently; rebuilt only when one changes.
+
+    A PDF that fails to download is indexed from its cached copy, or else
+    keeps its days from the existing index, so an outage never drops months.
+    """
+    pdf_urls = list(dict.fromkeys(calendar_pdfs.values()))
+    print(f"Downloading {len(pdf_urls)} PDF calendars...")
+    downloaded = download_pdfs(pdf_urls)
+
+    pdf_contents = {}
+    for url in pdf_urls:
+        content = downloaded.get(url) or load_cached_body(url)
+        if content:
+            if url not in downloaded:
+                print(f"Using the cached copy of {url}")
+            pdf_contents[url] = content
+    pdfs = {url: hashlib.sha256(content).hexdigest() for url, content in pdf_contents.items()}
+
+    index = load_mincha_index()
+    failed = [url for url in pdf_urls if url not in pdf_contents and url in index.get('pdfs', {})]
+    for url in failed:
+        print(f"Could not get {url}, keeping its days from the existing index")
+        pdfs[url] = index['pdfs'][url]
+
+    if pdfs and index.get('pdfs') == pdfs:
+        print("Mincha index is up to date")
+        return index
+
+    days = merge_mincha_indexes(extract_texts(pdf_contents))
+    for day, entry in index.get('days', {}).items():
+        if entry.get('pdf_url') in failed and day not in days:
+            days[day] = entry
+    if not days:
+        if index.get('days'):
+            print("No Mincha times found, keeping the existing index")
+        return index
+    return save_mincha_index(dict(sorted(days.items())), pdfs)
+
+def lookup_mincha(index, day):
+    """Mincha time for a date from a loaded index, or None if the index doesn't cover it"""
+    entry = index.get('days', {}).get(day.isoformat())
+    return entry['mincha'] if entry else None
+
 def save_mincha_time(mincha_time):
     """Save the Mincha time to JSON file"""
     if not mincha_time:
@@ -243,8 +508,19 @@ def main():
         print("3. The website mentions July 2025 and August 2025 calendars")
         return
     
-    # Determine which calendar to use based on current date
     today = date.today()
+    mincha_time = None
+    if MINCHA_SOURCE == 'index' and MINCHA_PDFS == 'all':
+        index = update_mincha_index_all(calendar_pdfs)
+        mincha_time = lookup_mincha(index, today)
+        if mincha_time:
+            print(f"Found Mincha time in index: {mincha_time}")
+            if save_mincha_time(mincha_time):
+                print("✅ Mincha time successfully scraped and saved!")
+            return
+        print("Today is not in the Mincha index, searching the current month's PDF...")
+    
+    # Determine which calendar to use based on current date
     current_month = today.strftime("%B").lower()
     
     print(f"Current month: {current_month}")
@@ -266,6 +542,9 @@ def main():
         target_pdf_url = list(calendar_pdfs.values())[0]
         print(f"Using fallback calendar: {list(calendar_pdfs.keys())[0]}")
     
+    # Only this month's pages are needed from a multi-month PDF
+    months = {(today.year, today.month)}
+    
     # Download the PDF
     print(f"Downloading PDF calendar: {target_pdf_url}")
     pdf_content = download_pdf(target_pdf_url)
@@ -274,22 +553,39 @@ def main():
         print("Failed to download PDF")
         return
     
-    # Extract text from PDF
-    print("Extracting text from PDF...")
-    pdf_text = extract_text_from_pdf(pdf_content)
-    
-    if not pdf_text:
-        print("Failed to extract text from PDF")
-        return
-    
-    # Save PDF text for debugging
-    with open('pdf_text_debug.txt', 'w', encoding='utf-8') as f:
-        f.write(pdf_text)
-    print("PDF text saved to pdf_text_debug.txt for debugging")
-    
-    # Find Mincha time for today
-    print("Searching for today's Mincha time...")
-    mincha_time = find_mincha_time_for_today(pdf_text)
+    pdf_text = None
+    if MINCHA_SOURCE == 'index' and MINCHA_PDFS == 'current':
+        # The index is only rebuilt when a new PDF is published
+        pdfs = {target_pdf_url: hashlib.sha256(pdf_content).hexdigest()}
+        index = load_mincha_index()
+        if index.get('pdfs') != pdfs:
+            print("New calendar PDF, building the month's Mincha index...")
+            pdf_text = extract_text_from_pdf(pdf_content, months)
+            index = save_mincha_index(merge_mincha_indexes({target_pdf_url: pdf_text}), pdfs)
+        mincha_time = lookup_mincha(index, date.today())
+        if mincha_time:
+            print(f"Found Mincha time in index: {mincha_time}")
+        else:
+            print("Today is not in the Mincha index, searching the PDF text...")
+
+    if not mincha_time:
+        # Extract text from PDF
+        if pdf_text is None:
+            print("Extracting text from PDF...")
+            pdf_text = extract_text_from_pdf(pdf_content, months)
+        
+        if not pdf_text:
+            print("Failed to extract text from PDF")
+            return
+        
+        # Save PDF text for debugging
+        with open('pdf_text_debug.txt', 'w', encoding='utf-8') as f:
+            f.write(pdf_text)
+        print("PDF text saved to pdf_text_debug.txt for debugging")
+        
+        # Find Mincha time for today
+        print("Searching for today's Mincha time...")
+        mincha_time = find_mincha_time_for_today(pdf_text)
     
     # Save to JSON file
     success = save_mincha_time(mincha_time)
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Offline weekly parasha schedule
+Computes the Torah reading for every Shabbat of a Hebrew year, for the
+Diaspora or Israel, with Hebcal's English names (e.g. "Vayakhel-Pekudei",
+"Pesach Shabbat Chol ha-Moed")
+"""
+
+from datetime import date, timedelta
+from functools import lru_cache
+
+from hebrew_calendar import (AV, NISAN, SIVAN, TISHREI, gregorian_to_hebrew,
+                             hebrew_to_ordinal, is_leap_year, new_year)
+
+PARSHIYOT = (
+    'Bereshit', 'Noach', 'Lech-Lecha', 'Vayera', 'Chayei Sara', 'Toldot',
+    'Vayetzei', 'Vayishlach', 'Vayeshev', 'Miketz', 'Vayigash', 'Vayechi',
+    'Shemot', 'Vaera', 'Bo', 'Beshalach', 'Yitro', 'Mishpatim',
+    'Terumah', 'Tetzaveh', 'Ki Tisa', 'Vayakhel', 'Pekudei',
+    'Vayikra', 'Tzav', 'Shmini', 'Tazria', 'Metzora', 'Achrei Mot',
+    'Kedoshim', 'Emor', 'Behar', 'Bechukotai',
+    'Bamidbar', 'Naso', "Beha'alotcha", "Sh'lach", 'Korach', 'Chukat',
+    'Balak', 'Pinchas', 'Matot', 'Masei',
+    'Devarim', 'Vaetchanan', 'Eikev', "Re'eh", 'Shoftim', 'Ki Teitzei',
+    'Ki Tavo', 'Nitzavim', 'Vayeilech', "Ha'azinu",
+)
+
+(BERESHIT, VAYAKHEL, TZAV, TAZRIA, METZORA, ACHREI_MOT, BEHAR, BAMIDBAR,
+ CHUKAT, MATOT, DEVARIM, NITZAVIM, VAYEILECH, HAAZINU) = (
+    PARSHIYOT.index(name) for name in (
+        'Bereshit', 'Vayakhel', 'Tzav', 'Tazria', 'Metzora', 'Achrei Mot', 'Behar', 'Bamidbar',
+        'Chukat', 'Matot', 'Devarim', 'Nitzavim', 'Vayeilech', "Ha'azinu"))
+
+SATURDAY = 5
+
+# Hebcal's name for a Shabbat that falls on a festival, by Hebrew date; the
+# Diaspora adds the second festival days
+_ISRAEL_HOLIDAYS = {
+    (TISHREI, 1): 'Rosh Hashana',
+    (TISHREI, 10): 'Yom Kippur',
+    (TISHREI, 15): 'Sukkot I',
+    **{(TISHREI, day): 'Sukkot Shabbat Chol ha-Moed' for day in range(16, 22)},
+    (TISHREI, 22): 'Shmini Atzeret',
+    (NISAN, 15): 'Pesach I',
+    **{(NISAN, day): 'Pesach Shabbat Chol ha-Moed' for day in range(16, 21)},
+    (NISAN, 21): 'Pesach VII',
+    (SIVAN, 6): 'Shavuot I',
+}
+_DIASPORA_HOLIDAYS = {
+    **_ISRAEL_HOLIDAYS,
+    (TISHREI, 16): 'Sukkot II',
+    (TISHREI, 23): 'Simchat Torah',
+    (NISAN, 16): 'Pesach II',
+    (NISAN, 22): 'Pesach VIII',
+    (SIVAN, 7): 'Shavuot II',
+}
+
+
+def _first_shabbat(ordinal):
+    """Ordinal of the first Shabbat on or after a day"""
+    return ordinal + (SATURDAY - date.fromordinal(ordinal).weekday()) % 7
+
+
+def _vayeilech_after_rosh_hashana(year):
+    """True if Vayeilech gets its own Shabbat between Rosh Hashana and Sukkot.
+
+    That happens when two Shabbatot fall between them (Rosh Hashana on Monday
+    or Tuesday); otherwise Nitzavim-Vayeilech is read before Rosh Hashana.
+    """
+    rosh_hashana = new_year(year)
+    sukkot = rosh_hashana + 14
+    yom_kippur = rosh_hashana + 9
+    shabbatot = [o for o in range(_first_shabbat(rosh_hashana + 2), sukkot, 7) if o != yom_kippur]
+    return len(shabbatot) == 2
+
+
+def _segments(year):
+    """(end ordinal, last parasha, pairs that may be combined) for each part of the cycle.
+
+    The readings are anchored by festivals: Tzav (Metzora in leap years) right
+    before Pesach, Bamidbar before Shavuot, Devarim before Tisha B'Av and
+    Nitzavim before Rosh Hashana. Pairs are listed in the order they are
+    combined when a part has fewer Shabbatot than readings.
+    """
+    leap = is_leap_year(year)
+    return (
+        (hebrew_to_ordinal(year, NISAN, 15),
+         METZORA if leap else TZAV,
+         (VAYAKHEL, TAZRIA) if leap else (VAYAKHEL,)),
+        (hebrew_to_ordinal(year, SIVAN, 6),
+         BAMIDBAR,
+         (ACHREI_MOT, BEHAR) if leap else (TAZRIA, ACHREI_MOT, BEHAR)),
+        (hebrew_to_ordinal(year, AV, 9) + 1,
+         DEVARIM,
+         (MATOT, CHUKAT)),
+        (new_year(year + 1),
+         NITZAVIM if _vayeilech_after_rosh_hashana(year + 1) else VAYEILECH,
+         ()),
+    )
+
+
+@lru_cache(maxsize=32)
+def year_schedule(year, israel=False):
+    """{date: reading} for every Shabbat of a Hebrew year.
+
+    Doubled parshiyot are joined with a hyphen, as Hebcal names them.
+    Raises ValueError if the readings can't be fitted to the year.
+    """
+    holiday_names = _ISRAEL_HOLIDAYS if israel else _DIASPORA_HOLIDAYS
+    holidays = {hebrew_to_ordinal(year, month, day): name for (month, day), name in holiday_names.items()}
+    simchat_torah = hebrew_to_ordinal(year, TISHREI, 22 if israel else 23)
+
+    readings = {}
+    before_sukkot = []
+    cycle = []
+    for ordinal in range(_first_shabbat(new_year(year)), new_year(year + 1), 7):
+        if ordinal in holidays:
+            readings[ordinal] = holidays[ordinal]
+        elif ordinal < simchat_torah:
+            before_sukkot.append(ordinal)
+        else:
+            cycle.append(ordinal)
+
+    # The end of last year's cycle: Vayeilech (if it wasn't read with Nitzavim) and Ha'azinu
+    for ordinal, parasha in zip(before_sukkot, (VAYEILECH, HAAZINU)[-len(before_sukkot):]):
+        readings[ordinal] = PARSHIYOT[parasha]
+
+    slot = 0
+    parasha = BERESHIT
+    for end, last, pairs in _segments(year):
+        shabbatot = [o for o in cycle[slot:] if o < end]
+        combined = {NITZAVIM} if last == VAYEILECH else set()
+        pairs = [first for first in pairs if parasha <= first < last]
+        needed = (last - parasha + 1) - len(combined) - len(shabbatot)
+        if needed > len(pairs):
+            raise ValueError(f"Cannot fit the readings of {year} before {date.fromordinal(end)}")
+        combined.update(pairs[:max(needed, 0)])
+        if needed < 0:
+            # Israel is a week ahead after an extra non-festival Shabbat, until
+            # the Diaspora catches up by combining a pair that Israel reads apart
+            last -= needed
+
+        for ordinal in shabbatot:
+            if parasha in combined:
+                readings[ordinal] = f"{PARSHIYOT[parasha]}-{PARSHIYOT[parasha + 1]}"
+                parasha += 2
+            else:
+                readings[ordinal] = PARSHIYOT[parasha]
+                parasha += 1
+        if parasha != last + 1 or parasha > HAAZINU:
+            raise ValueError(f"Cannot fit the readings of {year} before {date.fromordinal(end)}")
+        slot += len(shabbatot)
+
+    return {date.fromordinal(ordinal): reading for ordinal, reading in sorted(readings.items())}
+
+
+def build_index(start, end, israel=False):
+    """{date: reading} for every Shabbat from start to end (inclusive)"""
+    index = {}
+    for year in range(gregorian_to_hebrew(start).year, gregorian_to_hebrew(end).year + 1):
+        for day, reading in year_schedule(year, israel).items():
+            if start <= day <= end:
+                index[day] = reading
+    return index
+
+
+def upcoming_shabbat(day):
+    """The Shabbat on or after a date"""
+    return day + timedelta(days=(SATURDAY - day.weekday()) % 7)
+
+
+def parasha_for_shabbat(day, israel=False):
+    """Reading for the Shabbat on or after a date"""
+    shabbat = upcoming_shabbat(day)
+    return year_schedule(gregorian_to_hebrew(shabbat).year, israel)[shabbat]
+
+
+if __name__ == '__main__':
+    import sys
+
+    # Usage: parasha_calendar.py [YYYY-MM-DD] [--israel]
+    args = [arg for arg in sys.argv[1:] if arg != '--israel']
+    day = date.fromisoformat(args[0]) if args else date.today()
+    print(upcoming_shabbat(day), parasha_for_shabbat(day, israel='--israel' in sys.argv))
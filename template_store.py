@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+In-memory static templates
+Keeps template files in memory with precompressed variants, a content ETag
+and (on first use) a compiled Liquid template, reloading a file when its
+mtime, size or inode change
+"""
+
+import fnmatch
+import gzip
+import hashlib
+import os
+import threading
+from functools import lru_cache
+
+# Brotli is optional; without it only gzip variants are kept
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _compress(body):
+    """{encoding: bytes} for body, keeping only variants smaller than the original"""
+    variants = {'identity': body}
+    compressed = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        compressed['br'] = brotli.compress(body, quality=11)
+    for encoding, data in compressed.items():
+        if len(data) < len(body):
+            variants[encoding] = data
+    return variants
+
+
+@lru_cache(maxsize=None)
+def _liquid_environment():
+    """Shared Liquid environment (python-liquid is only needed for server-side rendering)"""
+    from liquid import Environment
+    return Environment()
+
+
+class TemplateStore:
+    """Files matching a pattern in one folder, served from memory"""
+
+    def __init__(self, folder, pattern='*'):
+        self.folder = folder
+        self.pattern = pattern
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def preload(self):
+        """Load every matching file, returning their names"""
+        names = sorted(name for name in os.listdir(self.folder) if fnmatch.fnmatch(name, self.pattern))
+        for name in names:
+            self.get(name)
+        return names
+
+    def get(self, name):
+        """{'text', 'etag', 'variants'} for a file, re-read only after it changes on disk"""
+        # One stat() per call; read errors propagate and are not cached
+        path = os.path.join(self.folder, name)
+        st = os.stat(path)
+        signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and entry['signature'] == signature:
+                return entry
+
+        with open(path, 'rb') as f:
+            body = f.read()
+        entry = {
+            'signature': signature,
+            'text': body.decode('utf-8'),
+            'etag': hashlib.sha1(body).hexdigest(),
+            'variants': _compress(body)
+        }
+
+        with self._lock:
+            self._entries[name] = entry
+        return entry
+
+    def compiled(self, name):
+        """Liquid template for a file, compiled once per version of the file"""
+        entry = self.get(name)
+        template = entry.get('compiled')
+        if template is None:
+            # Two threads may compile the same version; either result is fine
+            template = entry['compiled'] = _liquid_environment().from_string(entry['text'])
+        return template
+
+    def names(self):
+        """Names of the files loaded so far"""
+        with self._lock:
+            return sorted(self._entries)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+HebcalClient against a local stub server
+Keep-alive reuse, retries on 5xx, the circuit breaker and timeouts
+"""
+
+import json
+import socket
+import threading
+import time
+import unittest
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from hebcal_client import CircuitBreaker, CircuitOpenError, HebcalClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers GETs from the server's scripted (status, delay) responses"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append(self.client_address)
+            status, delay = server.responses.pop(0) if server.responses else server.default
+        if delay:
+            time.sleep(delay)
+        body = json.dumps({'status': status}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class HebcalClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.server.daemon_threads = True
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.responses = []
+        self.server.default = (200, 0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/hebcal"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def client(self, **kwargs):
+        kwargs.setdefault('backoff', 0)
+        client = HebcalClient(**kwargs)
+        self.addCleanup(client.session.close)
+        return client
+
+    def test_keep_alive_reuses_connection(self):
+        client = self.client()
+        for _ in range(3):
+            self.assertEqual(client.get_json(self.url), {'status': 200})
+        # Every request came from the same client socket
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(len(set(self.server.requests)), 1)
+
+    def test_retries_5xx_then_succeeds(self):
+        self.server.responses = [(503, 0), (502, 0)]
+        client = self.client(retries=2)
+        self.assertEqual(client.get_json(self.url), {'status': 200})
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_gives_up_after_retries(self):
+        self.server.default = (500, 0)
+        client = self.client(retries=2)
+        with self.assertRaises(requests.exceptions.HTTPError):
+            client.get_json(self.url)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(client.breaker.failures, 1)
+
+    def test_4xx_is_not_retried(self):
+        self.server.default = (404, 0)
+        client = self.client(retries=2)
+        with self.assertRaises(requests.exceptions.HTTPError):
+            client.get_json(self.url)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_breaker_opens_then_half_opens(self):
+        self.server.default = (500, 0)
+        client = self.client(retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=0.2))
+        for _ in range(2):
+            with self.assertRaises(requests.exceptions.HTTPError):
+                client.get_json(self.url)
+        self.assertEqual(client.breaker.state, 'open')
+
+        # Open: fails fast without touching the network
+        with self.assertRaises(CircuitOpenError):
+            client.get_json(self.url)
+        self.assertEqual(len(self.server.requests), 2)
+
+        # Half-open: a failed trial call re-opens the breaker
+        time.sleep(0.25)
+        self.assertEqual(client.breaker.state, 'half-open')
+        with self.assertRaises(requests.exceptions.HTTPError):
+            client.get_json(self.url)
+        self.assertEqual(client.breaker.state, 'open')
+        self.assertEqual(len(self.server.requests), 3)
+
+        # Half-open again: a successful trial call closes it
+        time.sleep(0.25)
+        self.server.default = (200, 0)
+        self.assertEqual(client.get_json(self.url), {'status': 200})
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_half_open_allows_one_trial_call(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+    def test_unexpected_error_ends_half_open_trial(self):
+        client = self.client(breaker=CircuitBreaker(failure_threshold=1, reset_timeout=0.1))
+        client.breaker.record_failure()
+        time.sleep(0.15)
+        with mock.patch.object(client.session, 'get', side_effect=ValueError('bad URL')):
+            with self.assertRaises(ValueError):
+                client.get_json(self.url)
+        self.assertEqual(client.breaker.state, 'open')
+
+        # The failed trial re-opened the breaker instead of leaving it stuck
+        time.sleep(0.15)
+        self.assertEqual(client.get_json(self.url), {'status': 200})
+        self.assertEqual(client.breaker.state, 'closed')
+
+    def test_read_timeout_is_not_retried(self):
+        self.server.default = (200, 1.0)
+        client = self.client(timeout=(1, 0.2), retries=2)
+        start = time.monotonic()
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            client.get_json(self.url)
+        self.assertLess(time.monotonic() - start, 0.9)
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(client.breaker.failures, 1)
+
+    def test_retries_stop_at_deadline(self):
+        self.server.default = (503, 0.2)
+        client = self.client(retries=10, backoff=0.1, backoff_max=0.1, deadline=0.5)
+        start = time.monotonic()
+        # The last attempt may also hit the read timeout clamped to the deadline
+        with self.assertRaises((requests.exceptions.HTTPError, requests.exceptions.ReadTimeout)):
+            client.get_json(self.url)
+        self.assertLess(time.monotonic() - start, 1.0)
+        self.assertLess(len(self.server.requests), 4)
+
+    def test_connection_refused_is_retried(self):
+        # A port nothing listens on
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            port = sock.getsockname()[1]
+        client = self.client(retries=2)
+        start = time.monotonic()
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            client.get_json(f"http://127.0.0.1:{port}/hebcal")
+        self.assertLess(time.monotonic() - start, 2)
+        self.assertEqual(client.breaker.failures, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
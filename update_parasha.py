@@ -7,10 +7,11 @@ Run this every Sunday at 12:01 AM CT
 import sys
 import os
 
-# Add the parent directory to the path so we can import from zmanim_server
+# Add the parent directory to the path so we can import from zmanim_core
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from zmanim_server import fetch_weekly_parasha
+# zmanim_core avoids importing Flask and the web server's state
+from zmanim_core import fetch_weekly_parasha
 
 if __name__ == '__main__':
     print("Updating weekly parasha...")
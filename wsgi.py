@@ -0,0 +1,14 @@
+#!/usr/bin/env python3
+"""
+WSGI entry point for production serving (see gunicorn.conf.py)
+Each worker process loads the persisted cache and starts its background
+refresher; the refresher lock lets only one of them poll upstream at a time.
+"""
+
+from zmanim_server import TEMPLATES, app, load_persistent_cache, start_background_refresher
+
+load_persistent_cache()
+TEMPLATES.preload()
+start_background_refresher()
+
+application = app
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+In-process zmanim calculator
+NOAA solar position equations, vectorized with NumPy across dates and locations.
+Produces the same keys as the generator's hebcal_zmanim.json "times" block.
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+# Degrees below the horizon for each solar-angle zman
+ALOT_HASHACHAR_DEGREES = 16.1
+MISHEYAKIR_DEGREES = 11.5
+MISHEYAKIR_MACHMIR_DEGREES = 10.2
+
+# Sunrise/sunset: upper limb on the horizon, with standard refraction
+SUNRISE_ZENITH = 90.833
+
+# Julian day of 1970-01-01T00:00Z
+UNIX_EPOCH_JD = 2440587.5
+
+SECONDS_PER_MINUTE = 60
+SECONDS_PER_DAY = 86400
+
+# Keys produced by compute_zmanim(), in chronological order
+ZMANIM_KEYS = (
+    'chatzotNight',
+    'alotHaShachar',
+    'misheyakir',
+    'misheyakirMachmir',
+    'sunrise',
+    'sofZmanShmaMGA',
+    'sofZmanShma',
+    'sofZmanTfillaMGA',
+    'sofZmanTfilla',
+    'chatzot',
+    'minchaGedola',
+    'minchaKetana',
+    'plagHaMincha',
+    'sunset',
+    'tzeit72min',
+)
+
+
+def _solar_terms(jd):
+    """Solar declination (radians) and equation of time (minutes) at Julian day jd"""
+    t = (jd - 2451545.0) / 36525.0
+
+    mean_longitude = np.radians((280.46646 + t * (36000.76983 + t * 0.0003032)) % 360)
+    mean_anomaly = np.radians(357.52911 + t * (35999.05029 - 0.0001537 * t))
+    eccentricity = 0.016708634 - t * (0.000042037 + 0.0000001267 * t)
+
+    center = (np.sin(mean_anomaly) * (1.914602 - t * (0.004817 + 0.000014 * t))
+              + np.sin(2 * mean_anomaly) * (0.019993 - 0.000101 * t)
+              + np.sin(3 * mean_anomaly) * 0.000289)
+    omega = np.radians(125.04 - 1934.136 * t)
+    apparent_longitude = np.radians(np.degrees(mean_longitude) + center - 0.00569 - 0.00478 * np.sin(omega))
+
+    mean_obliquity = 23 + (26 + (21.448 - t * (46.815 + t * (0.00059 - t * 0.001813))) / 60) / 60
+    obliquity = np.radians(mean_obliquity + 0.00256 * np.cos(omega))
+
+    declination = np.arcsin(np.sin(obliquity) * np.sin(apparent_longitude))
+
+    y = np.tan(obliquity / 2) ** 2
+    equation_of_time = 4 * np.degrees(
+        y * np.sin(2 * mean_longitude)
+        - 2 * eccentricity * np.sin(mean_anomaly)
+        + 4 * eccentricity * y * np.sin(mean_anomaly) * np.cos(2 * mean_longitude)
+        - 0.5 * y * y * np.sin(4 * mean_longitude)
+        - 1.25 * eccentricity * eccentricity * np.sin(2 * mean_anomaly))
+
+    return declination, equation_of_time
+
+
+def _solar_event(jd0, latitude, longitude, zenith, rising):
+    """Minutes after jd0 (UTC midnight) when the sun crosses zenith; NaN if it never does"""
+    lat = np.radians(latitude)
+    cos_zenith = np.cos(np.radians(zenith))
+
+    # Start from solar noon, then refine at the event time itself
+    minutes = 720 - 4 * longitude + np.zeros_like(jd0)
+    for _ in range(2):
+        declination, equation_of_time = _solar_terms(jd0 + minutes / 1440)
+        with np.errstate(invalid='ignore'):
+            hour_angle = np.degrees(np.arccos(
+                (cos_zenith - np.sin(lat) * np.sin(declination)) / (np.cos(lat) * np.cos(declination))))
+        noon = 720 - 4 * longitude - equation_of_time
+        minutes = noon - 4 * hour_angle if rising else noon + 4 * hour_angle
+    return minutes
+
+
+def compute_zmanim(dates, latitudes, longitudes, elevations=None, use_elevation=False):
+    """Compute zmanim for every (location, date) pair in one batched call.
+
+    dates is a sequence of datetime.date (or anything numpy accepts as
+    datetime64[D]); latitudes/longitudes (east positive) and elevations in
+    meters are scalars or sequences of equal length. Returns {key: array}
+    of Unix epoch seconds with shape (len(locations), len(dates)); NaN
+    marks zmanim that don't occur (polar day/night).
+    """
+    days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+    jd0 = (days + UNIX_EPOCH_JD)[np.newaxis, :]
+    day_start = (days * SECONDS_PER_DAY)[np.newaxis, :].astype(np.float64)
+
+    latitude = np.atleast_1d(np.asarray(latitudes, dtype=np.float64))[:, np.newaxis]
+    longitude = np.atleast_1d(np.asarray(longitudes, dtype=np.float64))[:, np.newaxis]
+
+    # Horizon dip for an observer above the surrounding terrain
+    sunrise_zenith = SUNRISE_ZENITH
+    if use_elevation and elevations is not None:
+        elevation = np.atleast_1d(np.asarray(elevations, dtype=np.float64))[:, np.newaxis]
+        sunrise_zenith = SUNRISE_ZENITH + 0.0347 * np.sqrt(np.maximum(elevation, 0))
+
+    def event(zenith, rising, day_offset=0):
+        minutes = _solar_event(jd0 + day_offset, latitude, longitude, zenith, rising)
+        return day_start + day_offset * SECONDS_PER_DAY + minutes * SECONDS_PER_MINUTE
+
+    sunrise = event(sunrise_zenith, rising=True)
+    sunset = event(sunrise_zenith, rising=False)
+    previous_sunset = event(sunrise_zenith, rising=False, day_offset=-1)
+
+    # Shaos zmaniyos: Gra counts sunrise to sunset, MGA 72 minutes before/after
+    shaah = (sunset - sunrise) / 12
+    alot72 = sunrise - 72 * SECONDS_PER_MINUTE
+    tzeit72 = sunset + 72 * SECONDS_PER_MINUTE
+    shaah_mga = (tzeit72 - alot72) / 12
+
+    return {
+        # Midnight between the previous evening's sunset and this morning's sunrise
+        'chatzotNight': (previous_sunset + sunrise) / 2,
+        'alotHaShachar': event(90 + ALOT_HASHACHAR_DEGREES, rising=True),
+        'misheyakir': event(90 + MISHEYAKIR_DEGREES, rising=True),
+        'misheyakirMachmir': event(90 + MISHEYAKIR_MACHMIR_DEGREES, rising=True),
+        'sunrise': sunrise,
+        'sofZmanShmaMGA': alot72 + 3 * shaah_mga,
+        'sofZmanShma': sunrise + 3 * shaah,
+        'sofZmanTfillaMGA': alot72 + 4 * shaah_mga,
+        'sofZmanTfilla': sunrise + 4 * shaah,
+        'chatzot': sunrise + 6 * shaah,
+        'minchaGedola': sunrise + 6.5 * shaah,
+        'minchaKetana': sunrise + 9.5 * shaah,
+        'plagHaMincha': sunrise + 10.75 * shaah,
+        'sunset': sunset,
+        'tzeit72min': tzeit72,
+    }
+
+
+def format_zmanim(epoch_times, tz):
+    """{key: epoch seconds} -> {key: ISO string} rounded to the minute, like the generator"""
+    times = {}
+    for key in ZMANIM_KEYS:
+        value = epoch_times[key]
+        if value is None or np.isnan(value):
+            continue
+        rounded = int(round(float(value) / SECONDS_PER_MINUTE)) * SECONDS_PER_MINUTE
+        times[key] = datetime.fromtimestamp(rounded, tz).isoformat()
+    return times
+
+
+def zmanim_for_day(day, latitude, longitude, tz, elevation=0, use_elevation=False, location=None):
+    """hebcal_zmanim.json-style dict for one date and location (tz is a tzinfo)"""
+    batch = compute_zmanim([day], [latitude], [longitude], [elevation], use_elevation)
+    return {
+        'date': day.isoformat(),
+        'location': location or {'latitude': latitude, 'longitude': longitude},
+        'times': format_zmanim({key: values[0, 0] for key, values in batch.items()}, tz)
+    }
+
+
+if __name__ == '__main__':
+    import json
+    import sys
+    import pytz
+
+    # Usage: zmanim_calc.py LAT LON TZID [YYYY-MM-DD]
+    latitude, longitude, tzid = float(sys.argv[1]), float(sys.argv[2]), sys.argv[3]
+    tz = pytz.timezone(tzid)
+    day = (datetime.strptime(sys.argv[4], '%Y-%m-%d') if len(sys.argv) > 4 else datetime.now(tz)).date()
+    print(json.dumps(zmanim_for_day(day, latitude, longitude, tz), indent=2))
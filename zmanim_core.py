@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+"""
+Import-light core shared by the web server and the cron scripts
+Location profiles, parasha naming and the weekly parasha. Only the standard
+library and the local calendar modules are imported up front; pytz,
+requests and the Hebcal client are imported when first needed.
+"""
+
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+import json
+import os
+import re
+import threading
+
+from day_timeline import CANDLE_LIGHTING_MINUTES, HAVDALAH_MINUTES
+from parasha_calendar import build_index, parasha_for_shabbat, upcoming_shabbat
+from single_flight import SingleFlight
+
+PARASHA_FILE = '/var/lib/homebridge/zmanim-js/parasha.json'
+PARASHA_MAP_FILE = os.path.join(os.path.dirname(__file__), 'ParashaMap_extracted.m')
+
+HEBCAL_LEYNING_API = 'https://www.hebcal.com/leyning'
+
+# Location profiles, selected with ?location=<id> or a /<id>/ path prefix.
+# latitude/longitude/elevation (meters) are used for the zmanim table; Hebcal is
+# queried by 'zip' when set, otherwise by coordinates. The minute offsets are optional;
+# 'israel' selects the Israel parasha schedule.
+DEFAULT_LOCATION = 'milwaukee'
+LOCATIONS = {
+    'milwaukee': {
+        'title': 'Milwaukee, WI 53216',
+        'zip': '53216',
+        'latitude': 43.088013,
+        'longitude': -87.977046,
+        'elevation': 0,
+        'tzid': 'America/Chicago',
+        'candle_lighting_minutes': 19,
+        'havdalah_minutes': 73,
+        'israel': False
+    }
+}
+
+# Where the weekly parasha comes from: 'local' (offline schedule, Israel or Diaspora
+# per location) or 'hebcal' (PARASHA_FILE, written from the Leyning API)
+PARASHA_SOURCE = 'local'
+PARASHA_INDEX_YEARS = 10  # years of Shabbatot indexed ahead of today
+
+_PARASHA_MAP_CACHE = None
+
+# (regex, replacements) compiled from the parasha map for phrase-level renaming
+_PARASHA_PATTERN_CACHE = None
+
+# Curly apostrophes Hebcal sometimes uses, folded to ASCII before matching
+_APOSTROPHES = str.maketrans({'’': "'", '‘': "'"})
+
+# LOCATIONS with defaults filled in and 'id'/'tz' added, built on first use
+_LOCATION_PROFILES = None
+
+# Offline parasha schedule: israel flag -> {'start', 'end', 'index': {date: parasha}}
+_PARASHA_INDEX = {}
+_PARASHA_INDEX_LOCK = threading.Lock()
+
+# Israel flag -> parasha data for the current week (same object all week)
+_LOCAL_PARASHA_DATA = {}
+
+# Coalesces concurrent upstream fetches for the same key into one request
+UPSTREAM_FLIGHTS = SingleFlight()
+
+def load_parasha_map():
+    """Load Hebcal->preferred parasha name mappings from ParashaMap_extracted.m"""
+    global _PARASHA_MAP_CACHE
+    if _PARASHA_MAP_CACHE is not None:
+        return _PARASHA_MAP_CACHE
+
+    mapping = {}
+    pattern = re.compile(r'^\{"([^"]+)",\s*"([^"]+)"\},?$')
+
+    try:
+        with open(PARASHA_MAP_FILE, 'r', encoding='utf-8-sig') as f:
+            for raw_line in f:
+                line = raw_line.strip()
+                match = pattern.match(line)
+                if not match:
+                    continue
+
+                hebcal_name = match.group(1).strip()
+                preferred_name = match.group(2).strip()
+                mapping[hebcal_name] = preferred_name
+    except FileNotFoundError:
+        print(f"Warning: {PARASHA_MAP_FILE} not found. Using Hebcal names as-is.")
+
+    _PARASHA_MAP_CACHE = mapping
+    return _PARASHA_MAP_CACHE
+
+def _parasha_pattern():
+    """Compile the parasha map into one longest-first regex alternation"""
+    global _PARASHA_PATTERN_CACHE
+    if _PARASHA_PATTERN_CACHE is not None:
+        return _PARASHA_PATTERN_CACHE
+
+    # Replacing keys one at a time, longest first, also rewrites earlier
+    # replacements that contain a shorter key; apply that to each replacement
+    # up front so a single pass gives the same result
+    steps = sorted(load_parasha_map().items(), key=lambda item: len(item[0]), reverse=True)
+    replacements = {}
+    for i, (source, target) in enumerate(steps):
+        for later_source, later_target in steps[i + 1:]:
+            target = target.replace(later_source, later_target)
+        # Curly-apostrophe keys can't occur once apostrophes are folded
+        if source == source.translate(_APOSTROPHES):
+            replacements[source] = target
+
+    sources = sorted(replacements, key=len, reverse=True)
+    pattern = re.compile('|'.join(re.escape(source) for source in sources)) if sources else None
+    _PARASHA_PATTERN_CACHE = (pattern, replacements)
+    return _PARASHA_PATTERN_CACHE
+
+@lru_cache(maxsize=256)
+def normalize_parasha_name(parasha_name):
+    """Rename a Hebcal parasha name using ParashaMap_extracted.m"""
+    if not parasha_name:
+        return parasha_name
+
+    mapping = load_parasha_map()
+    cleaned = parasha_name.strip()
+    ascii_apostrophe = cleaned.translate(_APOSTROPHES)
+    exact_match = mapping.get(cleaned) or mapping.get(ascii_apostrophe)
+    if exact_match:
+        return exact_match
+
+    # Fall back to phrase-level replacements so holiday/parasha combinations
+    # like "Pesach Shabbat Chol ha-Moed" still honor the preferred spellings.
+    pattern, replacements = _parasha_pattern()
+    if pattern is None:
+        return ascii_apostrophe
+    return pattern.sub(lambda match: replacements[match.group(0)], ascii_apostrophe)
+
+def load_locations():
+    """Location profiles by id, with defaults filled in; invalid profiles are skipped"""
+    global _LOCATION_PROFILES
+    if _LOCATION_PROFILES is not None:
+        return _LOCATION_PROFILES
+
+    import pytz
+
+    profiles = {}
+    for location_id, settings in LOCATIONS.items():
+        try:
+            profile = {
+                'id': location_id,
+                'title': location_id,
+                'zip': None,
+                'elevation': 0,
+                'candle_lighting_minutes': CANDLE_LIGHTING_MINUTES,
+                'havdalah_minutes': HAVDALAH_MINUTES,
+                'israel': False
+            }
+            profile.update(settings)
+            profile['latitude'] = float(profile['latitude'])
+            profile['longitude'] = float(profile['longitude'])
+            profile['tz'] = pytz.timezone(profile['tzid'])
+        except (KeyError, TypeError, ValueError, pytz.UnknownTimeZoneError) as e:
+            print(f"Warning: skipping location {location_id!r}: {e!r}")
+            continue
+        profiles[location_id] = profile
+
+    _LOCATION_PROFILES = profiles
+    return _LOCATION_PROFILES
+
+def get_location(location_id=None):
+    """Profile for a location id (DEFAULT_LOCATION if None), or None if unknown"""
+    return load_locations().get(location_id or DEFAULT_LOCATION)
+
+def get_parasha_index(israel=False, today=None):
+    """Offline {Shabbat date: normalized parasha} index covering the coming years"""
+    today = today or date.today()
+    with _PARASHA_INDEX_LOCK:
+        entry = _PARASHA_INDEX.get(israel)
+        if entry and entry['start'] <= today <= entry['end']:
+            return entry['index']
+
+        start = today - timedelta(days=7)
+        # A timedelta rather than replace(year=...), which fails on Feb 29
+        end = today + timedelta(days=366 * PARASHA_INDEX_YEARS)
+        index = {day: normalize_parasha_name(name) for day, name in build_index(start, end, israel).items()}
+        _PARASHA_INDEX[israel] = {'start': start, 'end': end, 'index': index}
+        return index
+
+def compute_weekly_parasha(location=None):
+    """This week's parasha from the offline schedule, in parasha.json's layout"""
+    location = location or get_location()
+    israel = location['israel']
+    today = datetime.now(location['tz']).date()
+    shabbat = upcoming_shabbat(today)
+
+    data = _LOCAL_PARASHA_DATA.get(israel)
+    if data and data['shabbat_date'] == shabbat.isoformat():
+        return data
+
+    parasha_name = get_parasha_index(israel, today).get(shabbat)
+    if parasha_name is None:
+        parasha_name = normalize_parasha_name(parasha_for_shabbat(shabbat, israel))
+    data = {
+        'parasha': parasha_name,
+        'shabbat_date': shabbat.isoformat(),
+        'schedule': 'israel' if israel else 'diaspora'
+    }
+    _LOCAL_PARASHA_DATA[israel] = data
+    return data
+
+def write_json_atomic(path, data):
+    """Write JSON via a temp file and rename so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def fetch_weekly_parasha():
+    """Fetch weekly parasha from Hebcal Leyning API (or the offline schedule) and save to file"""
+    # Concurrent callers (refresher, /update-parasha) share one fetch and one write
+    return UPSTREAM_FLIGHTS.do('parasha', _fetch_weekly_parasha)
+
+def _fetch_weekly_parasha():
+    if PARASHA_SOURCE == 'local':
+        now = datetime.now(get_location()['tz'])
+        parasha_data = dict(compute_weekly_parasha(), updated=now.isoformat())
+        try:
+            write_json_atomic(PARASHA_FILE, parasha_data)
+        except OSError as e:
+            return dict(parasha_data, error=str(e))
+        print(f"Parasha updated: {parasha_data['parasha']} for {parasha_data['shabbat_date']}")
+        return parasha_data
+
+    import requests
+    from hebcal_client import client as hebcal_client
+
+    try:
+        # Get the upcoming Saturday (or current if today is Saturday)
+        now = datetime.now(get_location()['tz'])
+        days_ahead = 5 - now.weekday()  # Saturday is weekday 5
+        if days_ahead < 0:
+            days_ahead += 7
+        
+        # Get date range (today through next Saturday)
+        start_date = now.date()
+        end_date = (now + timedelta(days=days_ahead)).date()
+        
+        params = {
+            'cfg': 'json',
+            'start': start_date.strftime('%Y-%m-%d'),
+            'end': end_date.strftime('%Y-%m-%d')
+        }
+        
+        data = hebcal_client.get_json(HEBCAL_LEYNING_API, params=params)
+        
+        # Find the Shabbat reading (type=shabbat or weekday 6/Saturday)
+        parasha_name = None
+        for item in data.get('items', []):
+            # Look for the Saturday/Shabbat reading
+            item_date = datetime.strptime(item.get('date'), '%Y-%m-%d').date()
+            if item_date.weekday() == 5:  # Saturday
+                name_obj = item.get('name', {})
+                if isinstance(name_obj, dict):
+                    parasha_name = name_obj.get('en')
+                break
+        
+        if not parasha_name:
+            parasha_name = 'Unknown'
+        else:
+            parasha_name = normalize_parasha_name(parasha_name)
+        
+        # Save to file
+        parasha_data = {
+            'parasha': parasha_name,
+            'updated': now.isoformat(),
+            'shabbat_date': end_date.strftime('%Y-%m-%d')
+        }
+        
+        write_json_atomic(PARASHA_FILE, parasha_data)
+        
+        print(f"Parasha updated: {parasha_name} for {end_date}")
+        return parasha_data
+        
+    except requests.exceptions.RequestException as e:
+        print(f"Error fetching Leyning data: {e}")
+        return {'parasha': 'Unknown', 'error': str(e)}
+    except Exception as e:
+        print(f"Error parsing Leyning data: {e}")
+        return {'parasha': 'Unknown', 'error': str(e)}
@@ -4,89 +4,231 @@ Zmanim (Jewish Halachic Times) Server for TRMNL Plugin
 Displays prayer times based on time of day
 """
 
-from flask import Flask, jsonify, render_template, request, abort
+from flask import Flask, jsonify, request, abort
+from contextlib import contextmanager
 from datetime import datetime, date, time, timedelta
+import fcntl
+import hashlib
 import json
+import math
 import os
-import re
-import pytz
+import threading
 import requests
 
+from day_timeline import DayTimeline, format_time
+from hebcal_client import client as hebcal_client
+from hebrew_calendar import hebrew_date_string
+from template_store import TemplateStore
+from zmanim_core import (DEFAULT_LOCATION, PARASHA_FILE, PARASHA_SOURCE, UPSTREAM_FLIGHTS,
+                         compute_weekly_parasha, fetch_weekly_parasha, get_location,
+                         load_locations, write_json_atomic)
+from zmanim_table import ZmanimTable, write_table
+
 app = Flask(__name__)
 
 # Load zmanim data
 ZMANIM_FILE = '/var/lib/homebridge/zmanim-js/hebcal_zmanim.json'
-PARASHA_FILE = '/var/lib/homebridge/zmanim-js/parasha.json'
-PARASHA_MAP_FILE = os.path.join(os.path.dirname(__file__), 'ParashaMap_extracted.m')
-
-# Hebcal API configuration
-HEBCAL_API_BASE = 'https://www.hebcal.com/hebcal'
-HEBCAL_LEYNING_API = 'https://www.hebcal.com/leyning'
-HEBCAL_ZIP = '53216'
-
-# API key authentication removed - endpoints are now public
-
-_PARASHA_MAP_CACHE = None
-
-def load_parasha_map():
-    """Load Hebcal->preferred parasha name mappings from ParashaMap_extracted.m"""
-    global _PARASHA_MAP_CACHE
-    if _PARASHA_MAP_CACHE is not None:
-        return _PARASHA_MAP_CACHE
 
-    mapping = {}
-    pattern = re.compile(r'^\{"([^"]+)",\s*"([^"]+)"\},?$')
+# Zmanim source: 'file' reads the generator's ZMANIM_FILE, switching to the year-ahead
+# table when the generator hasn't written today's file; 'table' uses only the table.
+# The generator only covers DEFAULT_LOCATION; other locations always use their table.
+ZMANIM_SOURCE = 'file'
+ZMANIM_TABLE_FILE = '/var/cache/zmanim-tracker/zmanim_table_{location}.bin'
+ZMANIM_TABLE_DAYS = 366
 
-    try:
-        with open(PARASHA_MAP_FILE, 'r', encoding='utf-8-sig') as f:
-            for raw_line in f:
-                line = raw_line.strip()
-                match = pattern.match(line)
-                if not match:
-                    continue
-
-                hebcal_name = match.group(1).strip()
-                preferred_name = match.group(2).strip()
-                mapping[hebcal_name] = preferred_name
-    except FileNotFoundError:
-        print(f"Warning: {PARASHA_MAP_FILE} not found. Using Hebcal names as-is.")
+# Location profiles (LOCATIONS), the parasha source and PARASHA_FILE are configured
+# in zmanim_core.py, which update_parasha.py shares without importing Flask
 
-    _PARASHA_MAP_CACHE = mapping
-    return _PARASHA_MAP_CACHE
+# Last-known-good state (Hebcal index, zmanim, parasha) for warm starts and outages.
+# zmanim-tracker.service creates this directory via CacheDirectory=.
+CACHE_FILE = '/var/cache/zmanim-tracker/zmanim_cache.json'
 
-def normalize_parasha_name(parasha_name):
-    """Rename a Hebcal parasha name using ParashaMap_extracted.m"""
-    if not parasha_name:
-        return parasha_name
+# Under gunicorn (gunicorn.conf.py) each worker is a separate process. These lock
+# files let one worker at a time refresh, fetch upstream data or write CACHE_FILE;
+# the others pick up its results from CACHE_FILE.
+REFRESHER_LOCK_FILE = '/var/cache/zmanim-tracker/refresher.lock'
+UPSTREAM_LOCK_FILE = '/var/cache/zmanim-tracker/upstream.lock'
 
-    mapping = load_parasha_map()
-    cleaned = parasha_name.strip()
-    ascii_apostrophe = cleaned.replace('’', "'").replace('‘', "'")
-    exact_match = mapping.get(cleaned) or mapping.get(ascii_apostrophe)
-    if exact_match:
-        return exact_match
+# Hebcal API configuration
+HEBCAL_API_BASE = 'https://www.hebcal.com/hebcal'
 
-    normalized = ascii_apostrophe
+# Calendar data fetched per Hebcal request: 'day', 'month' or 'year'
+HEBCAL_PREFETCH = 'month'
+
+# Where the header's Hebrew date comes from: 'local' (offline calendar) or 'hebcal' (API)
+HEBREW_DATE_SOURCE = 'local'
+
+# Static Liquid templates (templates/trmnl_markup*.html) are served from memory,
+# precompressed. Edits are picked up on the next request, but clients and nginx
+# may keep the old copy for up to TEMPLATE_MAX_AGE seconds.
+TEMPLATE_PATTERN = 'trmnl_markup*.html'
+TEMPLATE_MAX_AGE = 86400
+TEMPLATES = TemplateStore(os.path.join(app.root_path, app.template_folder), TEMPLATE_PATTERN)
+
+# Layouts rendered server-side by /render/<layout> (and /html, which renders 'full')
+LAYOUTS = {
+    'full': 'trmnl_markup.html',
+    'half_horizontal': 'trmnl_markup_half_horizontal.html',
+    'quadrant': 'trmnl_markup_quadrant.html',
+    'hebcal': 'trmnl_markup_hebcal.html',
+    'hebcal_date': 'trmnl_markup_hebcal_date.html',
+    'hebcal_parasha': 'trmnl_markup_hebcal_parasha.html',
+}
 
-    # Fall back to phrase-level replacements so holiday/parasha combinations
-    # like "Pesach Shabbat Chol ha-Moed" still honor the preferred spellings.
-    for source, target in sorted(mapping.items(), key=lambda item: len(item[0]), reverse=True):
-        if source in normalized:
-            normalized = normalized.replace(source, target)
+# API key authentication removed - endpoints are now public
 
-    return normalized
+# Hebcal calendar cache: (location id, local date) -> {'data': ..., 'expires': datetime}
+_HEBCAL_CACHE = {}
+_HEBCAL_CACHE_STATS = {'hits': 0, 'misses': 0, 'stale': 0}
+_HEBCAL_CACHE_LOCK = threading.Lock()
+HEBCAL_KEEP_PAST_DAYS = 2  # past dates kept per location, so a last good value survives rollover
+
+# Background refresher for upstream (Hebcal) data
+REFRESH_INTERVAL = 60  # seconds between checks
+REFRESH_AHEAD = timedelta(minutes=10)  # fetch the next day's data this long before midnight
+REFRESH_RETRY = timedelta(minutes=15)  # minimum gap between attempts for the same data
+_REFRESHER_THREAD = None
+_REFRESHER_LEADER = threading.Event()  # set while this process holds REFRESHER_LOCK_FILE
+_REFRESH_WAKEUP = threading.Event()
+_REFRESH_ATTEMPTS = {}
+
+# Last successfully loaded zmanim/parasha files, and the CACHE_FILE contents merged in
+_LAST_GOOD = {'zmanim': None, 'parasha': None}
+_LOADED_CACHE_STATE = None
+
+# Open year-ahead tables, and the last date a build failed (so it isn't retried per request),
+# by location id
+_ZMANIM_TABLES = {}
+_ZMANIM_TABLE_FAILED_DAYS = {}
+_ZMANIM_TABLE_LOCK = threading.Lock()
+
+# Parsed JSON files: path -> {'signature': (mtime_ns, size, inode), 'data': ...}
+_FILE_CACHE = {}
+_FILE_CACHE_LOCK = threading.Lock()
+
+# (times dict, parsed datetimes) for the most recently parsed zmanim file
+_PARSED_TIMES_CACHE = (None, None)
+
+# Location id -> (times dict, day, DayTimeline) for its most recently built timeline
+_TIMELINE_CACHE = {}
+
+# Serialized responses: (endpoint, location, minute) -> {'body', 'etag', 'expires', ...}
+_SNAPSHOT_CACHE = {}
+_SNAPSHOT_CACHE_STATS = {'hits': 0, 'misses': 0}
+_SNAPSHOT_CACHE_LOCK = threading.Lock()
+
+def resolve_location(location_id=None):
+    """Profile selected by a path prefix or ?location=, aborting with 404 if unknown"""
+    location = get_location(location_id or request.args.get('location'))
+    if location is None:
+        abort(404)
+    return location
+
+def _load_json_file(path):
+    """Load a JSON file, re-reading it only when its mtime, size or inode change"""
+    # The generator rewrites these files about once a day, so nearly every call
+    # costs one stat(). Read/parse errors propagate and are not cached.
+    st = os.stat(path)
+    signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    with _FILE_CACHE_LOCK:
+        entry = _FILE_CACHE.get(path)
+        if entry and entry['signature'] == signature:
+            return entry['data']
+
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    with _FILE_CACHE_LOCK:
+        _FILE_CACHE[path] = {'signature': signature, 'data': data}
+    return data
+
+@contextmanager
+def _process_lock(path):
+    """Hold an exclusive flock on a lock file, serializing a task across worker processes"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lock_file = open(path, 'a')
+    except OSError as e:
+        # Without a writable lock directory each process just works on its own
+        print(f"Warning: could not open {path}: {e}")
+        yield
+        return
+
+    with lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+def _table_usable(table, location, day):
+    """True if an open table matches the location's profile and covers a date"""
+    return (table is not None and table.covers(day)
+            and (table.latitude, table.longitude, table.tzid)
+            == (location['latitude'], location['longitude'], location['tzid']))
+
+def get_zmanim_table(location, day):
+    """Open a location's year-ahead zmanim table, (re)building it if it doesn't cover a date"""
+    location_id = location['id']
+    path = ZMANIM_TABLE_FILE.format(location=location_id)
+    with _ZMANIM_TABLE_LOCK:
+        table = _ZMANIM_TABLES.get(location_id)
+        try:
+            st = os.stat(path)
+            signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+        except FileNotFoundError:
+            signature = None
+
+        try:
+            if signature and (table is None or table.signature != signature):
+                table = ZmanimTable(path)
+            # Rebuild when the profile's coordinates or timezone have been edited
+            if (not _table_usable(table, location, day)
+                    and _ZMANIM_TABLE_FAILED_DAYS.get(location_id) != day):
+                with _process_lock(f"{path}.lock"):
+                    # Another worker may have rebuilt it while this one waited
+                    if os.path.exists(path):
+                        table = ZmanimTable(path)
+                    if not _table_usable(table, location, day):
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        write_table(path, day, ZMANIM_TABLE_DAYS,
+                                    location['latitude'], location['longitude'], location['tzid'],
+                                    location['elevation'], location['title'])
+                        table = ZmanimTable(path)
+                        print(f"Zmanim table built for {location_id}: {table.start} to {table.end}")
+        except (ImportError, OSError, ValueError) as e:
+            print(f"Warning: zmanim table unavailable for {location_id}: {e}")
+            _ZMANIM_TABLE_FAILED_DAYS[location_id] = day
+            return None
+
+        _ZMANIM_TABLES[location_id] = table
+        return table if table and table.covers(day) else None
+
+def load_zmanim_table_day(location, day):
+    """Zmanim for a location and date from its table, in the generator's JSON layout"""
+    table = get_zmanim_table(location, day)
+    return table.day_data(day) if table else None
+
+def load_zmanim_data(location=None):
+    """Load zmanim data for a location, falling back to the table or the last good copy"""
+    location = location or get_location()
+    today = datetime.now(location['tz']).date()
+    if ZMANIM_SOURCE == 'table' or location['id'] != DEFAULT_LOCATION:
+        return load_zmanim_table_day(location, today)
 
-def load_zmanim_data():
-    """Load zmanim data from JSON file"""
     try:
-        with open(ZMANIM_FILE, 'r') as f:
-            return json.load(f)
+        data = _load_json_file(ZMANIM_FILE)
     except FileNotFoundError:
         print(f"Warning: {ZMANIM_FILE} not found.")
-        return None
+        return load_zmanim_table_day(location, today) or _last_good('zmanim')
     except json.JSONDecodeError:
         print(f"Warning: Invalid JSON in {ZMANIM_FILE}")
-        return None
+        return load_zmanim_table_day(location, today) or _last_good('zmanim')
+    _remember_last_good('zmanim', data)
+
+    file_date = data.get('date')
+    if file_date and file_date != today.isoformat():
+        # The generator hasn't written today's file yet
+        return load_zmanim_table_day(location, today) or data
+    return data
 
 def parse_time(time_str):
     """Parse ISO time string to datetime object"""
@@ -95,88 +237,155 @@ def parse_time(time_str):
     except:
         return None
 
-def load_parasha_data():
-    """Load parasha data from JSON file"""
+def parse_zmanim_times(zmanim_data):
+    """Convert zmanim 'times' strings to datetimes, reused until the file changes"""
+    global _PARSED_TIMES_CACHE
+    times = zmanim_data.get('times', {})
+    cached_times, cached_objects = _PARSED_TIMES_CACHE
+    if cached_times is times:
+        return cached_objects
+
+    time_objects = {}
+    for key, time_str in times.items():
+        parsed_time = parse_time(time_str)
+        if parsed_time:
+            time_objects[key] = parsed_time
+
+    _PARSED_TIMES_CACHE = (times, time_objects)
+    return time_objects
+
+def get_day_timeline(zmanim_data, day, location=None):
+    """DayTimeline for a location's zmanim and civil day, rebuilt only when either changes"""
+    location = location or get_location()
+    times = zmanim_data.get('times', {})
+    cached_times, cached_day, cached_timeline = _TIMELINE_CACHE.get(location['id'], (None, None, None))
+    if cached_times is times and cached_day == day:
+        return cached_timeline
+
+    timeline = DayTimeline.build(parse_zmanim_times(zmanim_data), day,
+                                 location['candle_lighting_minutes'], location['havdalah_minutes'])
+    _TIMELINE_CACHE[location['id']] = (times, day, timeline)
+    return timeline
+
+def load_parasha_data(location=None):
+    """Load parasha data from the offline schedule or JSON file, falling back to the last good copy"""
+    if PARASHA_SOURCE == 'local':
+        return compute_weekly_parasha(location)
+
     try:
-        with open(PARASHA_FILE, 'r') as f:
-            return json.load(f)
+        data = _load_json_file(PARASHA_FILE)
     except FileNotFoundError:
         print(f"Warning: {PARASHA_FILE} not found.")
-        return {'parasha': 'Unknown'}
+        return _last_good('parasha') or {'parasha': 'Unknown'}
     except json.JSONDecodeError:
         print(f"Warning: Invalid JSON in {PARASHA_FILE}")
-        return {'parasha': 'Unknown'}
+        return _last_good('parasha') or {'parasha': 'Unknown'}
+    _remember_last_good('parasha', data)
+    return data
+
+def _last_good(name):
+    """Last successfully loaded copy of a data file, from memory or CACHE_FILE"""
+    if _LAST_GOOD[name] is None:
+        load_persistent_cache()
+    return _LAST_GOOD[name]
+
+def _remember_last_good(name, data):
+    """Track a freshly loaded data file and persist it if its contents changed"""
+    previous = _LAST_GOOD[name]
+    if previous is data:
+        return
+    _LAST_GOOD[name] = data
+    if previous != data:
+        save_persistent_cache()
+
+def save_persistent_cache():
+    """Atomically write Hebcal data and last good zmanim/parasha files to CACHE_FILE"""
+    with _process_lock(f"{CACHE_FILE}.lock"):
+        # Keep what other workers have written since this one last read the file
+        load_persistent_cache()
+
+        with _HEBCAL_CACHE_LOCK:
+            hebcal = {}
+            for (location_id, day), entry in _HEBCAL_CACHE.items():
+                hebcal.setdefault(location_id, {})[day] = entry['data']
+
+        state = {
+            'saved_at': datetime.now(get_location()['tz']).isoformat(),
+            'hebcal': hebcal,
+            'zmanim': _LAST_GOOD['zmanim'],
+            'parasha': _LAST_GOOD['parasha']
+        }
 
-def fetch_weekly_parasha():
-    """Fetch weekly parasha from Hebcal Leyning API and save to file"""
+        try:
+            os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
+            write_json_atomic(CACHE_FILE, state)
+        except OSError as e:
+            print(f"Warning: could not write {CACHE_FILE}: {e}")
+
+def load_persistent_cache():
+    """Merge CACHE_FILE into the in-memory caches; True if it was read"""
+    global _LOADED_CACHE_STATE
     try:
-        # Get the upcoming Saturday (or current if today is Saturday)
-        now = datetime.now(pytz.timezone('America/Chicago'))
-        days_ahead = 5 - now.weekday()  # Saturday is weekday 5
-        if days_ahead < 0:
-            days_ahead += 7
-        
-        # Get date range (today through next Saturday)
-        start_date = now.date()
-        end_date = (now + timedelta(days=days_ahead)).date()
-        
-        params = {
-            'cfg': 'json',
-            'start': start_date.strftime('%Y-%m-%d'),
-            'end': end_date.strftime('%Y-%m-%d')
-        }
-        
-        response = requests.get(HEBCAL_LEYNING_API, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Find the Shabbat reading (type=shabbat or weekday 6/Saturday)
-        parasha_name = None
-        for item in data.get('items', []):
-            # Look for the Saturday/Shabbat reading
-            item_date = datetime.strptime(item.get('date'), '%Y-%m-%d').date()
-            if item_date.weekday() == 5:  # Saturday
-                name_obj = item.get('name', {})
-                if isinstance(name_obj, dict):
-                    parasha_name = name_obj.get('en')
-                break
-        
-        if not parasha_name:
-            parasha_name = 'Unknown'
-        else:
-            parasha_name = normalize_parasha_name(parasha_name)
-        
-        # Save to file
-        parasha_data = {
-            'parasha': parasha_name,
-            'updated': now.isoformat(),
-            'shabbat_date': end_date.strftime('%Y-%m-%d')
-        }
-        
-        with open(PARASHA_FILE, 'w') as f:
-            json.dump(parasha_data, f, indent=2)
-        
-        print(f"Parasha updated: {parasha_name} for {end_date}")
-        return parasha_data
-        
-    except requests.exceptions.RequestException as e:
-        print(f"Error fetching Leyning data: {e}")
-        return {'parasha': 'Unknown', 'error': str(e)}
-    except Exception as e:
-        print(f"Error parsing Leyning data: {e}")
-        return {'parasha': 'Unknown', 'error': str(e)}
+        state = _load_json_file(CACHE_FILE)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    except OSError as e:
+        print(f"Warning: could not read {CACHE_FILE}: {e}")
+        return False
+
+    # _load_json_file returns the same object until the file changes
+    if state is _LOADED_CACHE_STATE:
+        return True
+    _LOADED_CACHE_STATE = state
+
+    with _HEBCAL_CACHE_LOCK:
+        for location_id, days in state.get('hebcal', {}).items():
+            # Entries for locations that have since been removed are dropped
+            location = load_locations().get(location_id)
+            if location is None:
+                continue
+            for day, data in days.items():
+                _HEBCAL_CACHE.setdefault((location_id, day), {
+                    'data': data,
+                    'expires': _hebcal_expiry(day, location)
+                })
+            _prune_hebcal_cache(location_id, datetime.now(location['tz']).strftime('%Y-%m-%d'))
+
+    for name in _LAST_GOOD:
+        if _LAST_GOOD[name] is None and state.get(name) is not None:
+            _LAST_GOOD[name] = state[name]
+    return True
+
+def _hebcal_range(day):
+    """(start, end) dates fetched together with a local date under HEBCAL_PREFETCH"""
+    day_date = datetime.strptime(day, '%Y-%m-%d').date()
+    if HEBCAL_PREFETCH == 'year':
+        return date(day_date.year, 1, 1), date(day_date.year, 12, 31)
+    if HEBCAL_PREFETCH == 'month':
+        first = day_date.replace(day=1)
+        last = (first + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return first, last
+    return day_date, day_date
+
+def _hebcal_location_params(location):
+    """Hebcal query parameters for a location: its zip code, or its coordinates"""
+    if location['zip']:
+        return {'zip': location['zip']}
+    return {
+        'geo': 'pos',
+        'latitude': location['latitude'],
+        'longitude': location['longitude'],
+        'tzid': location['tzid']
+    }
 
-def fetch_hebcal_data():
-    """Fetch Hebrew calendar data from Hebcal API"""
+def _request_hebcal_range(start, end, location):
+    """Fetch Hebrew calendar data for a date range from Hebcal API, indexed by date"""
     try:
-        today = datetime.now().strftime('%Y-%m-%d')
-        
-        params = {
+        params = dict(_hebcal_location_params(location), **{
             'v': '1',
             'cfg': 'json',
-            'zip': HEBCAL_ZIP,
-            'start': today,
-            'end': today,
+            'start': start.strftime('%Y-%m-%d'),
+            'end': end.strftime('%Y-%m-%d'),
             'maj': 'on',
             'min': 'on',
             'mod': 'on',
@@ -188,354 +397,405 @@ def fetch_hebcal_data():
             'c': 'on',
             'M': 'on',
             'lg': 'a'
-        }
+        })
         
-        response = requests.get(HEBCAL_API_BASE, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Extract Hebrew date and parasha from items
-        hdate = None
-        parasha = None
+        data = hebcal_client.get_json(HEBCAL_API_BASE, params=params)
+        location_title = data.get('location', {}).get('title', 'Unknown Location')
         
+        # Group items by date; candle lighting items carry a full timestamp
+        days = {}
         for item in data.get('items', []):
-            if item.get('category') == 'hebdate':
-                hdate = item.get('hdate')
-            elif item.get('category') in ['parashat', 'candles']:
+            item_date = (item.get('date') or '')[:10]
+            if not item_date:
+                continue
+            day = days.setdefault(item_date, {
+                'hdate': None,
+                'parasha': None,
+                'holidays': [],
+                'candles': None,
+                'location': location_title,
+                'date': item_date
+            })
+            category = item.get('category')
+            if category == 'hebdate':
+                day['hdate'] = item.get('hdate')
+            elif category in ['holiday', 'roshchodesh']:
+                day['holidays'].append(item.get('title'))
+            elif category in ['parashat', 'candles']:
+                if category == 'candles':
+                    day['candles'] = item.get('title')
                 # Parasha info is in the memo field
                 memo = item.get('memo')
                 if memo:
-                    parasha = memo
+                    day['parasha'] = memo
         
-        return {
-            'hdate': hdate,
-            'parasha': parasha,
-            'location': data.get('location', {}).get('title', 'Unknown Location'),
-            'date': today
-        }
+        return days
         
     except requests.exceptions.RequestException as e:
         print(f"Error fetching Hebcal data: {e}")
-        return {
-            'error': 'Failed to fetch Hebrew calendar data',
-            'hdate': None,
-            'parasha': None
-        }
+        return None
     except Exception as e:
         print(f"Error parsing Hebcal data: {e}")
+        return None
+
+def _hebcal_expiry(day, location):
+    """Local midnight at the end of a date (YYYY-MM-DD) in a location's timezone"""
+    day_date = datetime.strptime(day, '%Y-%m-%d').date()
+    return location['tz'].localize(datetime.combine(day_date + timedelta(days=1), time.min))
+
+def _prune_hebcal_cache(location_id, today):
+    """Drop past dates, keeping a few so a last good value survives rollover (caller holds the lock)"""
+    past = sorted(k for k in _HEBCAL_CACHE if k[0] == location_id and k[1] < today)
+    for old_key in past[:-HEBCAL_KEEP_PAST_DAYS]:
+        del _HEBCAL_CACHE[old_key]
+
+def _store_hebcal_days(days, now, location):
+    """Cache successful Hebcal lookups by location and local date and persist them to CACHE_FILE"""
+    fetched_at = now.isoformat()
+    with _HEBCAL_CACHE_LOCK:
+        for day, data in days.items():
+            _HEBCAL_CACHE[(location['id'], day)] = {
+                'data': dict(data, fetched_at=fetched_at),
+                'expires': _hebcal_expiry(day, location)
+            }
+        _prune_hebcal_cache(location['id'], now.strftime('%Y-%m-%d'))
+
+    save_persistent_cache()
+
+def _load_hebcal_index(location_id, day):
+    """Cached entry for a location and date after merging in CACHE_FILE, or None"""
+    load_persistent_cache()
+    with _HEBCAL_CACHE_LOCK:
+        return _HEBCAL_CACHE.get((location_id, day))
+
+def _latest_hebcal_entry(location_id, today):
+    """Most recent cached entry on or before today (caller holds the lock)"""
+    keys = [k for k in _HEBCAL_CACHE if k[0] == location_id and k[1] <= today]
+    return _HEBCAL_CACHE[max(keys)] if keys else None
+
+def hebcal_data_cached(location, day):
+    """True if Hebcal data for a location and local date is in memory or CACHE_FILE"""
+    with _HEBCAL_CACHE_LOCK:
+        if (location['id'], day) in _HEBCAL_CACHE:
+            return True
+    return _load_hebcal_index(location['id'], day) is not None
+
+def refresh_hebcal_data(day, location=None):
+    """Fetch Hebcal data for the prefetch range around a local date and cache it"""
+    location = location or get_location()
+    start, end = _hebcal_range(day)
+
+    def fetch():
+        with _process_lock(UPSTREAM_LOCK_FILE):
+            # Another worker may have fetched it while this one waited
+            if hebcal_data_cached(location, day):
+                return
+            now = datetime.now(location['tz'])
+            days = _request_hebcal_range(start, end, location)
+            # Errors are not cached so the last good value keeps being served
+            if days:
+                _store_hebcal_days(days, now, location)
+
+    # At midnight every polling device misses at once; only one of them fetches
+    UPSTREAM_FLIGHTS.do(('hebcal', location['id'], start, end), fetch)
+
+    with _HEBCAL_CACHE_LOCK:
+        entry = _HEBCAL_CACHE.get((location['id'], day))
+    if entry:
+        return entry['data']
+    return {
+        'error': 'Failed to fetch Hebrew calendar data',
+        'hdate': None,
+        'parasha': None
+    }
+
+def fetch_hebcal_data(location=None):
+    """Fetch Hebrew calendar data, cached per (location, local date) until local midnight"""
+    location = location or get_location()
+    now = datetime.now(location['tz'])
+    today = now.strftime('%Y-%m-%d')
+
+    with _HEBCAL_CACHE_LOCK:
+        entry = _HEBCAL_CACHE.get((location['id'], today))
+    if not entry:
+        entry = _load_hebcal_index(location['id'], today)
+
+    with _HEBCAL_CACHE_LOCK:
+        if entry and now < entry['expires']:
+            _HEBCAL_CACHE_STATS['hits'] += 1
+            return entry['data']
+
+        # Stale-while-revalidate: serve the last good value while the
+        # background refresher fetches today's data
+        stale = _latest_hebcal_entry(location['id'], today)
+        if stale and background_refresher_running():
+            _HEBCAL_CACHE_STATS['stale'] += 1
+            _REFRESH_WAKEUP.set()
+            return stale['data']
+        _HEBCAL_CACHE_STATS['misses'] += 1
+
+    data = refresh_hebcal_data(today, location)
+    if 'error' in data and stale:
+        # Hebcal is failing (or the circuit is open); fall back to the last good value
+        return stale['data']
+    return data
+
+def get_hebcal_cache_stats():
+    """Return hit/miss counts for the Hebcal calendar cache"""
+    with _HEBCAL_CACHE_LOCK:
         return {
-            'error': 'Failed to parse Hebrew calendar data',
-            'hdate': None,
-            'parasha': None
+            'hits': _HEBCAL_CACHE_STATS['hits'],
+            'misses': _HEBCAL_CACHE_STATS['misses'],
+            'stale': _HEBCAL_CACHE_STATS['stale'],
+            'entries': len(_HEBCAL_CACHE)
         }
 
-def get_next_time_only(zmanim_data):
+def _should_attempt(name, now):
+    """Rate-limit refresh attempts so a failing upstream isn't hammered"""
+    last_attempt = _REFRESH_ATTEMPTS.get(name)
+    if last_attempt and now - last_attempt < REFRESH_RETRY:
+        return False
+    _REFRESH_ATTEMPTS[name] = now
+    return True
+
+def refresh_upstream_data():
+    """Refresh Hebcal calendar and parasha data that is missing or about to expire"""
+    if HEBREW_DATE_SOURCE == 'hebcal':
+        for location in load_locations().values():
+            now = datetime.now(location['tz'])
+            # Shortly before midnight this is tomorrow, so the rollover is already cached
+            days = {now.strftime('%Y-%m-%d'), (now + REFRESH_AHEAD).strftime('%Y-%m-%d')}
+            for day in sorted(days):
+                if (not hebcal_data_cached(location, day)
+                        and _should_attempt(('hebcal', location['id'], day), now)):
+                    refresh_hebcal_data(day, location)
+
+    now = datetime.now(get_location()['tz'])
+    today = now.strftime('%Y-%m-%d')
+
+    if PARASHA_SOURCE == 'local':
+        return
+
+    # parasha.json is good until its Shabbat has passed
+    parasha_data = load_parasha_data()
+    stale = (parasha_data.get('parasha', 'Unknown') == 'Unknown'
+             or parasha_data.get('shabbat_date', '') < today)
+    if stale and _should_attempt('parasha', now):
+        fetch_weekly_parasha()
+
+def _refresher_loop():
+    # With several workers only the one holding the lock refreshes; the others
+    # wait here and one takes over if that worker exits
+    with _process_lock(REFRESHER_LOCK_FILE):
+        _REFRESHER_LEADER.set()
+        try:
+            while True:
+                try:
+                    refresh_upstream_data()
+                except Exception as e:
+                    print(f"Error in background refresh: {e}")
+                _REFRESH_WAKEUP.wait(REFRESH_INTERVAL)
+                _REFRESH_WAKEUP.clear()
+        finally:
+            _REFRESHER_LEADER.clear()
+
+def start_background_refresher():
+    """Start the background refresher thread (once per process)"""
+    global _REFRESHER_THREAD
+    if _REFRESHER_THREAD is not None and _REFRESHER_THREAD.is_alive():
+        return
+    _REFRESHER_THREAD = threading.Thread(target=_refresher_loop, name='upstream-refresher', daemon=True)
+    _REFRESHER_THREAD.start()
+
+def background_refresher_running():
+    """True if this process's refresher holds the lock and is refreshing.
+
+    A worker whose refresher is still waiting for the lock would only wake
+    its own idle thread, so it must fetch (via refresh_hebcal_data) instead.
+    """
+    return (_REFRESHER_THREAD is not None and _REFRESHER_THREAD.is_alive()
+            and _REFRESHER_LEADER.is_set())
+
+def get_data_age(now, parasha_data, location):
+    """Seconds since the upstream data behind a response was fetched"""
+    ages = {}
+
+    updated = parse_time(parasha_data.get('updated') or '')
+    if updated and updated.tzinfo:
+        ages['parasha'] = int((now - updated).total_seconds())
+
+    if HEBREW_DATE_SOURCE == 'hebcal':
+        with _HEBCAL_CACHE_LOCK:
+            entry = _latest_hebcal_entry(location['id'], now.strftime('%Y-%m-%d'))
+        fetched_at = parse_time(entry['data']['fetched_at']) if entry else None
+        if fetched_at:
+            ages['hebcal'] = int((now - fetched_at).total_seconds())
+
+    return ages
+
+def get_hebrew_date(now, sunset=None, location=None):
+    """Hebrew date for display, advancing to the next day after sunset"""
+    if HEBREW_DATE_SOURCE == 'hebcal':
+        return fetch_hebcal_data(location).get('hdate')
+
+    # A sunset left over from another day's zmanim must not shift today's date
+    after_sunset = bool(sunset and sunset.date() == now.date() and now >= sunset)
+    return hebrew_date_string(now.date(), after_sunset=after_sunset)
+
+def get_next_time_only(zmanim_data, location=None):
     """Get only the next upcoming time"""
     if not zmanim_data:
         return {"error": "No zmanim data available"}
     
-    now = datetime.now(pytz.timezone('America/Chicago'))
+    location = location or get_location()
+    now = datetime.now(location['tz'])
     today = now.date()
     
-    # Fetch Hebrew calendar data
-    hebcal_data = fetch_hebcal_data()
-    
     # Load parasha data
-    parasha_data = load_parasha_data()
+    parasha_data = load_parasha_data(location)
     
-    # Parse today's times
-    times = zmanim_data.get('times', {})
-    
-    # Convert string times to datetime objects
-    time_objects = {}
-    for key, time_str in times.items():
-        parsed_time = parse_time(time_str)
-        if parsed_time:
-            time_objects[key] = parsed_time
-    
-    # Get all relevant times throughout the day
-    sunrise = time_objects.get('sunrise')
-    chatzot = time_objects.get('chatzot')
-    sunset = time_objects.get('sunset')
-    tzeit72min = time_objects.get('tzeit72min')
-    
-    if not chatzot or not sunset:
+    timeline = get_day_timeline(zmanim_data, today, location)
+    if not timeline:
         return {"error": "Missing critical times"}
     
-    # Build list of all times with their names
-    all_times = []
-    
-    # Early Morning times
-    if chatzot_night:
-        all_times.append(("Midnight", chatzot_night))
-    if alot_hashachar:
-        all_times.append(("Dawn", alot_hashachar))
-    if misheyakir_machmir:
-        all_times.append(("Earliest Daven", misheyakir_machmir))
-    if sunrise:
-        all_times.append(("Sunrise", sunrise))
-    
-    # Morning times
-    if time_objects.get('sofZmanShmaMGA'):
-        all_times.append(("Shema (MGA)", time_objects.get('sofZmanShmaMGA')))
-    if time_objects.get('sofZmanShma'):
-        all_times.append(("Shema (Gra)", time_objects.get('sofZmanShma')))
-    if time_objects.get('sofZmanTfilla'):
-        all_times.append(("Tefilla (Gra)", time_objects.get('sofZmanTfilla')))
-    if chatzot:
-        all_times.append(("Chatzos", chatzot))
-    
-    # Afternoon times
-    if time_objects.get('minchaKetana'):
-        all_times.append(("Mincha Ketana", time_objects.get('minchaKetana')))
-    
-    # Friday candle lighting
-    if today.weekday() == 4 and sunset:
-        candle_lighting = sunset - timedelta(minutes=19)
-        all_times.append(("Candle Lighting", candle_lighting))
-        erev_shabbos_sunset = sunset - timedelta(minutes=1)
-        all_times.append(("Sunset", erev_shabbos_sunset))
-    elif sunset:
-        all_times.append(("Sunset", sunset))
-    
-    # Saturday evening times
-    if today.weekday() == 5 and sunset:
-        shabbos_evening_sunset = sunset - timedelta(minutes=1)
-        maariv_time = sunset + timedelta(minutes=59)
-        havdalah_time = sunset + timedelta(minutes=73)
-        all_times.append(("Sunset", shabbos_evening_sunset))
-        all_times.append(("Maariv", maariv_time))
-        all_times.append(("Havdalah", havdalah_time))
-    
-    # Evening times
-    if tzeit72min:
-        all_times.append(("Tzeis (72 min)", tzeit72min))
-    if time_objects.get('chatzotNight'):
-        all_times.append(("Chatzos Night", time_objects.get('chatzotNight')))
-    
-    # Filter to only future times and get the first one
-    next_time = None
-    next_time_name = None
-    
-    for name, time_obj in all_times:
-        if time_obj and time_obj > now:
-            next_time = time_obj
-            next_time_name = name
-            break
-    
-    # Get early morning times
-    alot_hashachar = time_objects.get('alotHaShachar')
-    misheyakir_machmir = time_objects.get('misheyakirMachmir')
-    chatzot_night = time_objects.get('chatzotNight')
-    
-    # Determine period based on current time
-    if chatzot_night and sunrise and now >= chatzot_night and now < sunrise:
-        period = "Early Morning"
-    elif sunrise and now >= sunrise and now < chatzot:
-        if today.weekday() == 5:  # Saturday
-            period = "Shabbos Morning"
-        else:
-            period = "Morning"
-    elif now >= chatzot and now < sunset:
-        if today.weekday() == 4:
-            period = "Erev Shabbos"
-        elif today.weekday() == 5:  # Saturday
-            period = "Shabbos Afternoon"
-        else:
-            period = "Afternoon"
-    elif today.weekday() == 5 and sunset and now >= sunset:
-        # Saturday evening - check if before or after Havdalah
-        havdalah_time = sunset + timedelta(minutes=73)
-        if now < havdalah_time:
-            period = "Shabbos Evening"
-        else:
-            period = "Motzei Shabbos"
-    elif now >= sunset or (chatzot_night and now < chatzot_night):
-        period = "Evening"
-    else:
-        period = "Morning"
+    period, _ = timeline.period_at(now)
     
     # Format the next time
     formatted_times = []
-    if next_time and next_time_name:
-        formatted_times.append([next_time_name, next_time.strftime("%-I:%M %p")])
+    next_zman = timeline.next_zman(now)
+    if next_zman:
+        next_time_name, next_time = next_zman
+        formatted_times.append([next_time_name, format_time(next_time)])
     
     return {
         "period": period,
-        "current_time": now.strftime("%-I:%M %p"),
+        "current_time": format_time(now),
         "date": today.strftime("%a, %B ") + str(today.day) + today.strftime(", %Y"),
-        "hdate": hebcal_data.get('hdate', 'Unknown'),
+        "hdate": get_hebrew_date(now, timeline.sunset, location) or 'Unknown',
         "parasha": parasha_data.get('parasha', 'Unknown'),
         "times": formatted_times,
-        "location": zmanim_data.get('location', {}).get('title', 'Unknown Location')
+        "location": zmanim_data.get('location', {}).get('title', 'Unknown Location'),
+        "data_age": get_data_age(now, parasha_data, location)
     }
 
-def get_current_period(zmanim_data):
+def get_current_period(zmanim_data, location=None):
     """Determine current period and relevant times"""
     if not zmanim_data:
         return {"error": "No zmanim data available"}
     
-    now = datetime.now(pytz.timezone('America/Chicago'))
+    location = location or get_location()
+    now = datetime.now(location['tz'])
     today = now.date()
     
-    # Fetch Hebrew calendar data
-    hebcal_data = fetch_hebcal_data()
-    
     # Load parasha data
-    parasha_data = load_parasha_data()
-    
-    # Parse today's times
-    times = zmanim_data.get('times', {})
+    parasha_data = load_parasha_data(location)
     
-    # Convert string times to datetime objects
-    time_objects = {}
-    for key, time_str in times.items():
-        parsed_time = parse_time(time_str)
-        if parsed_time:
-            time_objects[key] = parsed_time
-    
-    # Determine current period
-    sunrise = time_objects.get('sunrise')
-    chatzot = time_objects.get('chatzot')
-    sunset = time_objects.get('sunset')
-    tzeit72min = time_objects.get('tzeit72min')
-    alot_hashachar = time_objects.get('alotHaShachar')
-    misheyakir_machmir = time_objects.get('misheyakirMachmir')
-    chatzot_night = time_objects.get('chatzotNight')
-    
-    if not chatzot or not sunset:
+    # Period boundaries and formatted times are precomputed once per file and day
+    timeline = get_day_timeline(zmanim_data, today, location)
+    if not timeline:
         return {"error": "Missing critical times"}
     
-    # Determine period and relevant times
-    if chatzot_night and sunrise and now >= chatzot_night and now < sunrise:
-        # Between midnight and sunrise - show Early Morning times
-        period = "Early Morning"
-        relevant_times = {
-            "Midnight": chatzot_night,
-            "Dawn": alot_hashachar,
-            "Earliest Daven": misheyakir_machmir,
-            "Sunrise": sunrise
-        }
-    elif sunrise and now >= sunrise and now < chatzot:
-        # After sunrise, before chatzot - show Morning times
-        # On Saturday, call it "Shabbos Morning"
-        if today.weekday() == 5:  # Saturday (0=Monday, 5=Saturday)
-            period = "Shabbos Morning"
-        else:
-            period = "Morning"
-        relevant_times = {
-            "Shema (MGA)": time_objects.get('sofZmanShmaMGA'),
-            "Shema (Gra)": time_objects.get('sofZmanShma'),
-            "Tefilla (Gra)": time_objects.get('sofZmanTfilla'),
-            "Chatzos": chatzot
-        }
-    elif now >= chatzot and now < sunset:
-        # After chatzot, before sunset - show Afternoon times
-        # On Friday, call it "Erev Shabbos" instead of "Afternoon"
-        # On Saturday, call it "Shabbos Afternoon"
-        if today.weekday() == 4:  # Friday (0=Monday, 4=Friday)
-            period = "Erev Shabbos"
-        elif today.weekday() == 5:  # Saturday
-            period = "Shabbos Afternoon"
-        else:
-            period = "Afternoon"
-        
-        relevant_times = {}
-        
-        # On Saturday (Shabbos Afternoon), show specific times in order
-        if today.weekday() == 5:  # Saturday
-            # Mincha Ketana
-            mincha_ketana = time_objects.get('minchaKetana')
-            if mincha_ketana:
-                relevant_times["Mincha Ketana"] = mincha_ketana.strftime("%-I:%M %p")
-            
-            # Sunset
-            if sunset:
-                relevant_times["Sunset"] = sunset.strftime("%-I:%M %p")
-            
-            # Maariv (60 minutes after sunset)
-            if sunset:
-                maariv_time = sunset + timedelta(minutes=60)
-                relevant_times["Maariv"] = maariv_time.strftime("%-I:%M %p")
-            
-            # Havdalah is same as tzeit72min (sunset + 72 minutes)
-            if tzeit72min:
-                relevant_times["Havdalah"] = tzeit72min.strftime("%-I:%M %p")
-        else:
-            # For other afternoons (including Friday), add Mincha Ketana
-            mincha_ketana = time_objects.get('minchaKetana')
-            if mincha_ketana:
-                relevant_times["Mincha Ketana"] = mincha_ketana.strftime("%-I:%M %p")
-            
-            # On Fridays, add Candle Lighting (19 minutes before sunset) and adjusted sunset
-            if today.weekday() == 4:  # Friday (0=Monday, 4=Friday)
-                if sunset:
-                    candle_lighting = sunset - timedelta(minutes=19)
-                    erev_shabbos_sunset = sunset - timedelta(minutes=1)
-                    relevant_times["Candle Lighting"] = candle_lighting.strftime("%-I:%M %p")
-                    relevant_times["Sunset"] = erev_shabbos_sunset.strftime("%-I:%M %p")
-            else:
-                # Add sunset time (formatted as 7:51 not 07:51)
-                if sunset:
-                    relevant_times["Sunset"] = sunset.strftime("%-I:%M %p")
-    elif today.weekday() == 5 and sunset and now >= sunset:
-        # Saturday evening - check if before or after Havdalah
-        havdalah_time = sunset + timedelta(minutes=73)  # Havdalah is sunset + 73 minutes
-        if now < havdalah_time:
-            # Between sunset and Havdalah - show Shabbos Evening times
-            period = "Shabbos Evening"
-            maariv_time = sunset + timedelta(minutes=59)  # Maariv is sunset + 59 minutes
-            shabbos_evening_sunset = sunset - timedelta(minutes=1)  # Sunset is sunset - 1 minute
-            relevant_times = {
-                "Sunset": shabbos_evening_sunset,
-                "Maariv": maariv_time,
-                "Havdalah": havdalah_time
-            }
-        else:
-            # After Havdalah - show Motzei Shabbos times
-            period = "Motzei Shabbos"
-            relevant_times = {
-                "Havdalah": havdalah_time,
-                "Latest Maleve Malka": time_objects.get('chatzotNight')
-            }
-    elif now >= sunset or (chatzot_night and now < chatzot_night):
-        # After sunset or before midnight - show Evening times
-        period = "Evening"
-        relevant_times = {
-            "Tzeis (72 min)": tzeit72min,
-            "Chatzos Night": time_objects.get('chatzotNight')
-        }
-    else:
-        # Fallback - show Shacharis times
-        period = "Morning"
-        relevant_times = {
-            "Shema (MGA)": time_objects.get('sofZmanShmaMGA'),
-            "Shema (Gra)": time_objects.get('sofZmanShma'),
-            "Tefilla (Gra)": time_objects.get('sofZmanTfilla'),
-            "Chatzos": chatzot
-        }
-    
-    # Format times for display
-    formatted_times = []
-    for name, time_obj in relevant_times.items():
-        if time_obj:
-            if isinstance(time_obj, str):
-                # Already formatted string
-                formatted_times.append([name, time_obj])
-            else:
-                # Datetime object - format it
-                formatted_times.append([name, time_obj.strftime("%-I:%M %p")])  # Remove leading zero
+    period, formatted_times = timeline.period_at(now)
     
     return {
         "period": period,
-        "current_time": now.strftime("%-I:%M %p"),  # Remove leading zero
+        "current_time": format_time(now),
         "date": today.strftime("%a, %B ") + str(today.day) + today.strftime(", %Y"),
-        "hdate": hebcal_data.get('hdate', 'Unknown'),
+        "hdate": get_hebrew_date(now, timeline.sunset, location) or 'Unknown',
         "parasha": parasha_data.get('parasha', 'Unknown'),
         "times": formatted_times,
-        "location": zmanim_data.get('location', {}).get('title', 'Unknown Location')
+        "location": zmanim_data.get('location', {}).get('title', 'Unknown Location'),
+        "data_age": get_data_age(now, parasha_data, location)
     }
 
+def next_display_change(now, zmanim_data, location=None):
+    """When the displayed output next changes: the next minute or period boundary"""
+    expires = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+    if zmanim_data:
+        timeline = get_day_timeline(zmanim_data, now.date(), location)
+        next_change = timeline.next_change(now) if timeline else None
+        if next_change and next_change < expires:
+            expires = next_change
+    return expires
+
+def snapshot_response(endpoint, location, build_response):
+    """Serve an endpoint for a location from a per-minute snapshot of its serialized response.
+
+    build_response(zmanim_data) is only called when the displayed minute, the
+    current period or the underlying data files have changed. Responses carry
+    a strong ETag and If-None-Match is answered with 304.
+    """
+    now = datetime.now(location['tz'])
+    zmanim_data = load_zmanim_data(location)
+    parasha_data = load_parasha_data(location)
+    key = (endpoint, location['id'], now.strftime('%Y-%m-%dT%H:%M'))
+
+    with _SNAPSHOT_CACHE_LOCK:
+        entry = _SNAPSHOT_CACHE.get(key)
+        # The loaders return the same objects until the files change on disk
+        fresh = (entry and now < entry['expires']
+                 and entry['zmanim_data'] is zmanim_data
+                 and entry['parasha_data'] is parasha_data)
+        _SNAPSHOT_CACHE_STATS['hits' if fresh else 'misses'] += 1
+
+    if not fresh:
+        response = build_response(zmanim_data)
+        body = response.get_data()
+        entry = {
+            'body': body,
+            'status': response.status_code,
+            'mimetype': response.mimetype,
+            'etag': hashlib.sha1(body).hexdigest(),
+            'expires': next_display_change(now, zmanim_data, location),
+            'zmanim_data': zmanim_data,
+            'parasha_data': parasha_data
+        }
+        if response.status_code == 200:
+            with _SNAPSHOT_CACHE_LOCK:
+                for stale_key in [k for k, v in _SNAPSHOT_CACHE.items() if v['expires'] <= now]:
+                    del _SNAPSHOT_CACHE[stale_key]
+                _SNAPSHOT_CACHE[key] = entry
+
+    response = app.response_class(entry['body'], status=entry['status'], mimetype=entry['mimetype'])
+    response.set_etag(entry['etag'])
+    set_cache_headers(response, now, entry['expires'])
+    return response.make_conditional(request)
+
+def set_cache_headers(response, now, expires):
+    """Let clients and nginx cache a response until the displayed output changes"""
+    max_age = max(0, int(math.ceil((expires - now).total_seconds())))
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.expires = expires
+    return response
+
+def template_response(name):
+    """Serve a static template from memory, precompressed to match Accept-Encoding"""
+    template = TEMPLATES.get(name)
+    variants = template['variants']
+    encoding = request.accept_encodings.best_match([e for e in ('br', 'gzip') if e in variants]) or 'identity'
+
+    response = app.response_class(variants[encoding], mimetype='text/html')
+    response.vary.add('Accept-Encoding')
+    if encoding == 'identity':
+        response.set_etag(template['etag'])
+    else:
+        # Each encoding is a different representation, so it needs its own strong ETag
+        response.content_encoding = encoding
+        response.set_etag(f"{template['etag']}-{encoding}")
+    response.cache_control.public = True
+    response.cache_control.max_age = TEMPLATE_MAX_AGE
+    return response.make_conditional(request)
+
+def get_snapshot_cache_stats():
+    """Return hit/miss counts for the response snapshot cache"""
+    with _SNAPSHOT_CACHE_LOCK:
+        return {
+            'hits': _SNAPSHOT_CACHE_STATS['hits'],
+            'misses': _SNAPSHOT_CACHE_STATS['misses'],
+            'entries': len(_SNAPSHOT_CACHE)
+        }
+
 @app.route('/')
 def home():
     """Home page with basic info"""
@@ -546,37 +806,61 @@ def home():
     """
 
 @app.route('/api/zmanim')
-def zmanim_api():
+@app.route('/<location_id>/api/zmanim')
+def zmanim_api(location_id=None):
     """API endpoint that returns zmanim data as JSON"""
-    data = get_current_period(load_zmanim_data())
-    return jsonify(data)
+    location = resolve_location(location_id)
+    return snapshot_response('api', location,
+                             lambda zmanim_data: jsonify(get_current_period(zmanim_data, location)))
 
 @app.route('/health')
 def health():
     """Health check endpoint"""
-    return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()})
+    return jsonify({
+        "status": "healthy",
+        "timestamp": datetime.now().isoformat(),
+        "hebcal_cache": get_hebcal_cache_stats(),
+        "snapshot_cache": get_snapshot_cache_stats(),
+        "locations": sorted(load_locations()),
+        "templates": TEMPLATES.names(),
+        "hebcal_client": dict(hebcal_client.stats(), coalesced=UPSTREAM_FLIGHTS.shared)
+    })
 
 @app.route('/html')
-def html_markup():
-    """HTML markup endpoint for TRMNL"""
-    data = get_current_period(load_zmanim_data())
-    return render_template('zmanim_display_liquid.html', **data)
+@app.route('/<location_id>/html')
+def html_markup(location_id=None):
+    """HTML markup endpoint for TRMNL (the full layout, rendered server-side)"""
+    return render_layout('full', location_id)
+
+@app.route('/render/<layout>')
+@app.route('/<location_id>/render/<layout>')
+def render_layout(layout, location_id=None):
+    """A TRMNL layout rendered server-side with the current payload, so devices get final HTML"""
+    if layout not in LAYOUTS:
+        abort(404)
+    location = resolve_location(location_id)
+    def build_response(zmanim_data):
+        data = get_current_period(zmanim_data, location)
+        # Same variables as TRMNL's polling merge: the payload as IDX_0 and at the top level
+        html = TEMPLATES.compiled(LAYOUTS[layout]).render(IDX_0=data, **data)
+        return app.response_class(html, mimetype='text/html')
+    return snapshot_response(f'render:{layout}', location, build_response)
 
 @app.route('/quadrant')
-def quadrant_markup():
+@app.route('/<location_id>/quadrant')
+def quadrant_markup(location_id=None):
     """HTML markup endpoint for TRMNL quadrant view - shows only next time"""
+    resolve_location(location_id)
     # Return raw Liquid template for TRMNL to process client-side
-    template_path = os.path.join(app.template_folder, 'trmnl_markup_quadrant.html')
-    with open(template_path, 'r') as f:
-        return f.read(), 200, {'Content-Type': 'text/html; charset=utf-8'}
+    return template_response('trmnl_markup_quadrant.html')
 
 @app.route('/hebcal')
-def hebcal_markup():
+@app.route('/<location_id>/hebcal')
+def hebcal_markup(location_id=None):
     """HTML markup endpoint for TRMNL - shows Hebrew date and Parasha"""
+    resolve_location(location_id)
     # Return raw Liquid template for TRMNL to process client-side
-    template_path = os.path.join(app.template_folder, 'trmnl_markup_hebcal.html')
-    with open(template_path, 'r') as f:
-        return f.read(), 200, {'Content-Type': 'text/html; charset=utf-8'}
+    return template_response('trmnl_markup_hebcal.html')
 
 @app.route('/update-parasha')
 def update_parasha():
@@ -587,5 +871,8 @@ def update_parasha():
 
 if __name__ == '__main__':
     print("Starting Zmanim Tracker Server...")
+    load_persistent_cache()
+    TEMPLATES.preload()
+    start_background_refresher()
     print("API available at: https://abie.live/zmanim/api/zmanim")
     app.run(host='0.0.0.0', port=5001, debug=False)
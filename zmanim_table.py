@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Year-ahead zmanim table
+Compact binary file, one row of fixed-width epoch-second columns per day,
+read through mmap so a day's zmanim are found by offset without parsing
+"""
+
+import mmap
+import os
+import struct
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+
+import pytz
+
+MAGIC = b'ZMTB'
+VERSION = 1
+
+# magic, version, column count, first day (days since 1970-01-01), day count,
+# latitude, longitude, elevation, tzid, location title
+HEADER = struct.Struct('<4sHHiIddd32s64s')
+COLUMN_NAME = struct.Struct('<24s')
+
+# Stored for zmanim that don't occur on a day (polar day/night)
+MISSING = -2 ** 63
+
+EPOCH = date(1970, 1, 1)
+
+
+def _data_offset(n_columns):
+    """Rows start after the header and column names, 8-byte aligned"""
+    offset = HEADER.size + n_columns * COLUMN_NAME.size
+    return (offset + 7) // 8 * 8
+
+
+def write_table(path, start, n_days, latitude, longitude, tzid, elevation=0, title=''):
+    """Compute n_days of zmanim from start for one location and write them to path"""
+    # NumPy is only needed to build tables, not to read them
+    import numpy as np
+    from zmanim_calc import ZMANIM_KEYS, compute_zmanim
+
+    dates = [start + timedelta(days=i) for i in range(n_days)]
+    batch = compute_zmanim(dates, [latitude], [longitude], [elevation])
+
+    # Round to the minute like the generator; NaN -> MISSING
+    columns = []
+    for key in ZMANIM_KEYS:
+        values = batch[key][0]
+        rounded = np.round(values / 60) * 60
+        columns.append(np.where(np.isnan(values), MISSING, rounded).astype('<i8'))
+    rows = np.stack(columns, axis=1)
+
+    header = HEADER.pack(
+        MAGIC, VERSION, len(ZMANIM_KEYS), (start - EPOCH).days, n_days,
+        latitude, longitude, elevation,
+        tzid.encode('ascii'), title.encode('utf-8')[:64])
+    names = b''.join(COLUMN_NAME.pack(key.encode('ascii')) for key in ZMANIM_KEYS)
+    padding = b'\0' * (_data_offset(len(ZMANIM_KEYS)) - len(header) - len(names))
+
+    # Write-then-rename: readers keep their mapping of the old file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(header + names + padding)
+        f.write(rows.tobytes())
+    os.replace(tmp_path, path)
+
+
+class ZmanimTable:
+    """Read-only mmap view of a table written by write_table()"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            self.signature = (st.st_mtime_ns, st.st_size, st.st_ino)
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, n_columns, start_day, n_days,
+         self.latitude, self.longitude, self.elevation,
+         tzid, title) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a version {VERSION} zmanim table")
+
+        self.start = EPOCH + timedelta(days=start_day)
+        self.n_days = n_days
+        self.tzid = tzid.rstrip(b'\0').decode('ascii')
+        self.title = title.rstrip(b'\0').decode('utf-8', errors='ignore')
+        self.tz = pytz.timezone(self.tzid)
+
+        self.columns = tuple(
+            COLUMN_NAME.unpack_from(self._mm, HEADER.size + i * COLUMN_NAME.size)[0].rstrip(b'\0').decode('ascii')
+            for i in range(n_columns))
+        self._row = struct.Struct(f'<{n_columns}q')
+        self._data_offset = _data_offset(n_columns)
+        self.day_data = lru_cache(maxsize=4)(self._day_data)
+
+        if len(self._mm) < self._data_offset + n_days * self._row.size:
+            self._mm.close()
+            raise ValueError(f"{path} is truncated")
+
+    @property
+    def end(self):
+        """Last date in the table"""
+        return self.start + timedelta(days=self.n_days - 1)
+
+    def covers(self, day):
+        return self.start <= day <= self.end
+
+    def epoch_row(self, day):
+        """{key: epoch seconds} for a date, or None if it's outside the table"""
+        index = (day - self.start).days
+        if not 0 <= index < self.n_days:
+            return None
+        values = self._row.unpack_from(self._mm, self._data_offset + index * self._row.size)
+        return {key: value for key, value in zip(self.columns, values) if value != MISSING}
+
+    def _day_data(self, day):
+        """hebcal_zmanim.json-style dict for a date (same object for repeated calls)"""
+        row = self.epoch_row(day)
+        if row is None:
+            return None
+        return {
+            'date': day.isoformat(),
+            'location': {
+                'title': self.title,
+                'tzid': self.tzid,
+                'latitude': self.latitude,
+                'longitude': self.longitude,
+                'elevation': self.elevation
+            },
+            'times': {key: datetime.fromtimestamp(value, self.tz).isoformat() for key, value in row.items()}
+        }
+
+    def close(self):
+        self._mm.close()